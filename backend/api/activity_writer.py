@@ -0,0 +1,387 @@
+"""
+Write-behind queue for user_activity rows.
+
+/api/related used to insert and commit its row before responding. Now it
+calls ActivityWriter.add(), which only appends to an in-memory buffer. A
+background thread writes the buffer as one multi-row INSERT when it holds
+`batch_size` rows or every `flush_interval` seconds. Flushing also happens
+on shutdown.
+
+add() returns an ActivityHandle, and /api/recommend passes it to update():
+
+- while the row is still buffered, the values are merged into it, so it is
+  inserted once with its final contents
+- once it has been written, an UPDATE of the newest row matching its
+  user_id, title and timestamp is queued behind the insert
+
+Batched inserts do not return row ids, so add() sets `timestamp` itself
+(the API server's clock, to the second) instead of leaving it to the
+column's CURRENT_TIMESTAMP default; that is what later updates match on.
+The timestamps are UTC, and on MySQL the writer's transactions run with
+the session time zone set to UTC. The TIMESTAMP column therefore stores
+the same instant CURRENT_TIMESTAMP would have, whatever the server's and
+the database's time zones, and other sessions read it in their own zone.
+
+Inserts commit in their own transaction before queued updates run. If the
+buffer reaches `max_buffer` or a write fails, the rows and every update
+queued after them are appended to a JSONL spill file in order. While the
+spill file is not empty it is replayed before anything newer is written, so
+an update never runs ahead of the insert it targets.
+
+Pre-forked workers share `spill_path`, so each process spills to its own
+`spill_path.<pid>`. Replays hold an flock on `spill_path.lock`. Under that
+lock a worker also adopts the spill files of processes that no longer
+exist, so no file is ever replayed twice.
+"""
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from sqlalchemy import and_, func, insert, select, text
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ActivityHandle:
+    """A row given to ActivityWriter.add()"""
+
+    __slots__ = ("row", "written", "spilled")
+
+    def __init__(self, row):
+        self.row = row
+        self.written = False  # taken by a flush; changes go through UPDATE
+        self.spilled = False  # in the spill file; changes are spilled too
+
+
+def _encode(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _decode_row(row):
+    if isinstance(row.get("timestamp"), str):
+        row["timestamp"] = datetime.fromisoformat(row["timestamp"])
+    return row
+
+
+class ActivityWriter:
+    """Buffered multi-row inserts and follow-up updates for one table"""
+
+    def __init__(self, engine, table, batch_size=200, flush_interval=0.5, max_buffer=10000,
+                 spill_path="./activity_spill.jsonl"):
+        self.engine = engine
+        self.table = table
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = float(flush_interval)
+        self.max_buffer = max(self.batch_size, int(max_buffer))
+        self.spill_path = spill_path
+        self._buffer = []   # ActivityHandles not yet written
+        self._updates = []  # (handle, values) for rows already written
+        self._lock = threading.Lock()
+        self._write_lock = threading.RLock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._running = False
+
+        self.added = 0
+        self.inserted = 0
+        self.updated = 0
+        self.merged = 0
+        self.flushes = 0
+        self.spilled = 0
+        self.replayed = 0
+        self.errors = 0
+
+    # --- PRODUCERS ---
+    def add(self, row):
+        """Queue a row for insertion and return its handle (never blocks on the database)"""
+        row = dict(row)
+        # Naive UTC (see _begin), to the second so the row can be matched
+        # again after a TIMESTAMP round trip
+        row.setdefault("timestamp", datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0))
+        handle = ActivityHandle(row)
+        with self._lock:
+            self.added += 1
+            if len(self._buffer) >= self.max_buffer:
+                self._spill([("insert", handle)])
+                return handle
+            self._buffer.append(handle)
+            full = len(self._buffer) >= self.batch_size
+        if full:
+            self._wake.set()
+        return handle
+
+    def update(self, handle, values):
+        """Apply values to a row whether it is buffered, written or spilled"""
+        with self._lock:
+            if handle.spilled:
+                self._spill([("update", handle, values)])
+            elif not handle.written:
+                handle.row.update(values)
+                self.merged += 1
+            else:
+                self._updates.append((handle, values))
+                self._wake.set()
+
+    def update_latest(self, user_id, title, values):
+        """Queue an update of the newest row for user_id and title (row added by another process)"""
+        handle = ActivityHandle({"user_id": user_id, "title": title})
+        handle.written = True
+        self.update(handle, values)
+
+    # --- FLUSHING ---
+    def start(self):
+        if self._running and self._pid == os.getpid():
+            return
+        # Threads do not survive fork(); each worker starts its own writer
+        self._running = True
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name="activity-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the writer thread and flush everything still buffered"""
+        self._running = False
+        self._wake.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=10)
+        self.flush()
+
+    def _run(self):
+        try:
+            self.replay_spill()
+        except Exception as e:
+            print(f"Activity spill replay error: {e}")
+        while self._running:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                # The thread must outlive any single bad flush
+                self.errors += 1
+                print(f"Activity writer error: {e}")
+
+    def _own_spill(self):
+        return f"{self.spill_path}.{os.getpid()}"
+
+    def _has_spill(self):
+        own = self._own_spill()
+        return os.path.exists(own) or os.path.exists(own + ".replaying")
+
+    @contextmanager
+    def _begin(self):
+        """A transaction that reads and writes TIMESTAMP values in UTC, like add()'s timestamps"""
+        with self.engine.begin() as conn:
+            if conn.dialect.name != "mysql":
+                yield conn  # SQLite keeps what it is given, and CURRENT_TIMESTAMP is UTC
+                return
+            # time_zone outlives the transaction, so the pooled connection gets its own back
+            previous = conn.execute(text("SELECT @@session.time_zone")).scalar()
+            conn.execute(text("SET time_zone = '+00:00'"))
+            try:
+                yield conn
+            finally:
+                conn.execute(text("SET time_zone = :tz"), {"tz": previous})
+
+    def _match(self, row):
+        t = self.table
+        conditions = [t.c.user_id == row["user_id"], t.c.title == row["title"]]
+        if row.get("timestamp") is not None:
+            conditions.append(t.c.timestamp == row["timestamp"])
+        return and_(*conditions)
+
+    def _insert(self, conn, rows):
+        if rows:
+            # One multi-row INSERT per batch (the MySQL driver folds executemany)
+            conn.execute(insert(self.table), rows)
+
+    def _update(self, conn, row, values):
+        # The newest matching row; MySQL cannot UPDATE with a subquery on the
+        # same table, so its id is looked up first
+        row_id = conn.execute(select(func.max(self.table.c.id)).where(self._match(row))).scalar()
+        if row_id is not None:
+            conn.execute(self.table.update().where(self.table.c.id == row_id).values(**values))
+
+    def _fail(self, error, records):
+        """Spill records plus every update queued since, keeping their order"""
+        self.errors += 1
+        with self._lock:
+            later, self._updates = self._updates, []
+            records = records + [("update", h, v) for h, v in later]
+            print(f"Activity flush error, spilling {len(records)} records: {error}")
+            self._spill(records)
+        return False
+
+    def flush(self):
+        """Write buffered rows, then queued updates; returns False if anything was spilled"""
+        with self._write_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+                updates, self._updates = self._updates, []
+                for handle in batch:
+                    handle.written = True
+            pending = [("insert", h) for h in batch] + [("update", h, v) for h, v in updates]
+
+            # Older spilled records go first, or updates could miss their rows
+            if self._has_spill() and not self.replay_spill():
+                if pending:
+                    with self._lock:
+                        self._spill(pending)
+                return False
+            if not pending:
+                return True
+
+            try:
+                with self._begin() as conn:
+                    self._insert(conn, [h.row for h in batch])
+            except Exception as e:
+                return self._fail(e, pending)
+            self.inserted += len(batch)
+
+            try:
+                with self._begin() as conn:
+                    for handle, values in updates:
+                        self._update(conn, handle.row, values)
+            except Exception as e:
+                return self._fail(e, [("update", h, v) for h, v in updates])
+            self.updated += len(updates)
+            self.flushes += 1
+            return True
+
+    # --- SPILL FILE ---
+    def _spill(self, records):
+        """Append records to the spill file (caller holds self._lock)"""
+        lines = []
+        for record in records:
+            handle = record[1]
+            handle.spilled = True
+            if record[0] == "insert":
+                lines.append({"op": "insert", "row": handle.row})
+            else:
+                lines.append({"op": "update", "row": handle.row, "values": record[2]})
+        try:
+            with open(self._own_spill(), "a") as f:
+                for line in lines:
+                    f.write(json.dumps(line, default=_encode) + "\n")
+            self.spilled += len(lines)
+        except OSError as e:
+            print(f"Activity spill error, {len(lines)} records lost: {e}")
+
+    @contextmanager
+    def _replay_lock(self):
+        """flock shared by every process using spill_path; yields False if another holds it"""
+        with open(self.spill_path + ".lock", "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _orphaned_spills(self):
+        """Spill files of exited processes (and pre-pid spill files), oldest first"""
+        directory = os.path.dirname(os.path.abspath(self.spill_path))
+        prefix = os.path.basename(self.spill_path)
+        orphans = []
+        for name in os.listdir(directory):
+            if not name.startswith(prefix):
+                continue
+            parts = name[len(prefix):].split(".")[1:]
+            replaying = parts[-1:] == ["replaying"]
+            pid = parts[0] if parts and parts[0].isdigit() else None
+            if len(parts) != (pid is not None) + replaying:
+                continue  # the lock file or something else entirely
+            if pid is not None and (int(pid) == os.getpid() or _pid_alive(int(pid))):
+                continue
+            orphans.append(((int(pid or 0), not replaying), os.path.join(directory, name)))
+        return [path for _, path in sorted(orphans)]
+
+    def replay_spill(self):
+        """Write spilled rows and updates in their original order; returns False if that failed"""
+        with self._write_lock, self._replay_lock() as locked:
+            if not locked:
+                return False  # another worker is replaying; retried on the next flush
+            for path in self._orphaned_spills():
+                if not self._replay_file(path):
+                    return False
+
+            own = self._own_spill()
+            replaying = own + ".replaying"
+            # Records spilled while replaying land in a fresh spill file
+            while self._has_spill():
+                if not os.path.exists(replaying):
+                    with self._lock:
+                        os.replace(own, replaying)
+                if not self._replay_file(replaying):
+                    return False
+            return True
+
+    def _replay_file(self, path):
+        with open(path) as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        try:
+            with self._begin() as conn:
+                rows = []
+                for record in records:
+                    row = _decode_row(record["row"])
+                    if record["op"] == "insert":
+                        rows.append(row)
+                        continue
+                    # Inserts before an update must reach the table first
+                    self._insert(conn, rows)
+                    rows = []
+                    self._update(conn, row, record["values"])
+                self._insert(conn, rows)
+        except Exception as e:
+            self.errors += 1
+            print(f"Activity spill replay failed, will retry: {e}")
+            return False
+
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Could not remove replayed spill file {path}: {e}")
+        self.replayed += len(records)
+        print(f"Replayed {len(records)} spilled activity records")
+        return True
+
+    def stats(self):
+        return {
+            "buffered": len(self._buffer),
+            "queued_updates": len(self._updates),
+            "added": self.added,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "merged_before_insert": self.merged,
+            "flushes": self.flushes,
+            "spilled": self.spilled,
+            "replayed": self.replayed,
+            "errors": self.errors,
+        }
+
+
+def activity_writer_from_env(engine, table):
+    """Build an ActivityWriter configured from ACTIVITY_* variables"""
+    return ActivityWriter(
+        engine,
+        table,
+        batch_size=int(os.getenv("ACTIVITY_BATCH_SIZE", "200")),
+        flush_interval=float(os.getenv("ACTIVITY_FLUSH_INTERVAL", "0.5")),
+        max_buffer=int(os.getenv("ACTIVITY_MAX_BUFFER", "10000")),
+        spill_path=os.getenv("ACTIVITY_SPILL_PATH", "./activity_spill.jsonl"),
+    )
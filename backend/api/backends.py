@@ -0,0 +1,275 @@
+"""
+Inference backends for the bias classifier.
+
+Every backend exposes the same interface:
+
+    backend.predict(texts, max_length) -> [[p_left, p_neutral, p_right], ...]
+
+so the batching queue and cache do not care which runtime produced the
+probabilities. Selected with INFERENCE_BACKEND:
+
+- torch      eager PyTorch (the original behaviour)
+- quantized  PyTorch with Linear layers dynamically quantized to int8
+- onnx       ONNX Runtime session over an exported copy of the model; the
+             export is redone whenever the source model's checksum changes
+
+Inputs are tokenized once without padding, sorted by token length and split
+into buckets whose padded size stays under a token budget, so one long post
+no longer forces a whole batch to be padded to max_length and very large
+requests never become one giant tensor. Results are returned in input order.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+BACKENDS = ("torch", "quantized", "onnx")
+# Backends whose built state forked workers can inherit; an ONNX Runtime
+# session owns thread pools that do not survive fork()
+PREFORK_BACKENDS = ("torch", "quantized")
+
+
+def make_buckets(lengths, token_budget):
+    """
+    Group indices into buckets of similar length.
+
+    Indices are sorted by length and a bucket is closed as soon as adding the
+    next (longest so far) item would make its padded size, count * max length,
+    exceed token_budget. Every bucket holds at least one item.
+    """
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    buckets, current = [], []
+    for idx in order:
+        if current and (len(current) + 1) * lengths[idx] > token_budget:
+            buckets.append(current)
+            current = []
+        current.append(idx)
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+class BucketedBackend:
+    """Shared length-bucketed predict(); subclasses implement _forward()"""
+
+    name = None
+    tensor_type = "pt"
+
+    def __init__(self, tokenizer, token_budget=8192, parallelism=1):
+        self.tokenizer = tokenizer
+        self.token_budget = max(1, int(token_budget))
+        self.parallelism = max(1, int(parallelism))
+        self._pool = ThreadPoolExecutor(max_workers=self.parallelism) if self.parallelism > 1 else None
+        self._stats_lock = threading.Lock()
+        self.real_tokens = 0
+        self.padded_tokens = 0
+        self.buckets_run = 0
+
+    def _forward(self, batch):
+        """Return class probabilities for one padded batch"""
+        raise NotImplementedError
+
+    def encode(self, texts, max_length=256):
+        """Tokenize without padding; returns one feature dict per text"""
+        if not texts:
+            return []
+        encoded = self.tokenizer(list(texts), truncation=True, max_length=max_length)
+        keys = list(encoded.keys())
+        return [{key: encoded[key][i] for key in keys} for i in range(len(texts))]
+
+    def predict(self, texts, max_length=256):
+        return self.predict_encoded(self.encode(texts, max_length))
+
+    def predict_encoded(self, features):
+        """Classify texts that were already tokenized with encode()"""
+        if not features:
+            return []
+        lengths = [len(f["input_ids"]) for f in features]
+        buckets = make_buckets(lengths, self.token_budget)
+
+        def run(bucket):
+            batch = self.tokenizer.pad([features[i] for i in bucket], return_tensors=self.tensor_type)
+            return bucket, self._forward(batch)
+
+        if self._pool is not None and len(buckets) > 1:
+            outputs = self._pool.map(run, buckets)
+        else:
+            outputs = map(run, buckets)
+
+        results = [None] * len(features)
+        for bucket, probs in outputs:
+            for idx, row in zip(bucket, probs):
+                results[idx] = row
+
+        with self._stats_lock:
+            self.buckets_run += len(buckets)
+            self.real_tokens += sum(lengths)
+            self.padded_tokens += sum(len(b) * max(lengths[i] for i in b) for b in buckets)
+        return results
+
+    def stats(self):
+        waste = 1 - self.real_tokens / self.padded_tokens if self.padded_tokens else 0.0
+        return {
+            "backend": self.name,
+            "token_budget": self.token_budget,
+            "parallelism": self.parallelism,
+            "buckets_run": self.buckets_run,
+            "real_tokens": self.real_tokens,
+            "padded_tokens": self.padded_tokens,
+            "padding_waste": round(waste, 4),
+        }
+
+
+class TorchBackend(BucketedBackend):
+    """Eager PyTorch inference"""
+
+    name = "torch"
+
+    def __init__(self, model, tokenizer, **bucketing):
+        super().__init__(tokenizer, **bucketing)
+        self.model = model
+
+    def _forward(self, batch):
+        with torch.no_grad():
+            logits = self.model(**batch).logits
+            probs = torch.softmax(logits, dim=1)
+        return probs.tolist()
+
+
+class QuantizedTorchBackend(TorchBackend):
+    """PyTorch inference with int8 dynamic quantization of the Linear layers"""
+
+    name = "quantized"
+
+    def __init__(self, model, tokenizer, **bucketing):
+        quantized = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        quantized.eval()
+        super().__init__(quantized, tokenizer, **bucketing)
+
+
+class OnnxBackend(BucketedBackend):
+    """ONNX Runtime inference over an export of the PyTorch model, redone when the model changes"""
+
+    name = "onnx"
+    tensor_type = "np"
+
+    def __init__(self, model, tokenizer, onnx_path, num_threads=None, source_checksum=None, **bucketing):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise RuntimeError("INFERENCE_BACKEND=onnx requires the onnxruntime package") from e
+
+        super().__init__(tokenizer, **bucketing)
+        if onnx_export_stale(onnx_path, source_checksum):
+            export_onnx(model, tokenizer, onnx_path, source_checksum)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = int(num_threads)
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _forward(self, batch):
+        feed = {name: batch[name].astype(np.int64) for name in self.input_names}
+        logits = self.session.run(["logits"], feed)[0]
+        # softmax in numpy; subtract the row max for numerical stability
+        exp = np.exp(logits - logits.max(axis=1, keepdims=True))
+        return (exp / exp.sum(axis=1, keepdims=True)).tolist()
+
+
+class _LogitsOnly(torch.nn.Module):
+    """Unwrap the HuggingFace output object so the exported graph returns plain logits"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask).logits
+
+
+def read_onnx_source(onnx_path):
+    """Checksum of the model onnx_path was exported from, or None"""
+    try:
+        with open(onnx_path + ".source") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def onnx_export_stale(onnx_path, source_checksum):
+    return source_checksum is None or read_onnx_source(onnx_path) != source_checksum
+
+
+def export_onnx(model, tokenizer, onnx_path, source_checksum=None, opset=17):
+    """
+    Export a sequence classification model to ONNX with dynamic batch/sequence axes.
+
+    The file is written under a temporary name and renamed into place, then
+    source_checksum is recorded next to it as onnx_path + ".source".
+    """
+    print(f"Exporting model to ONNX at {onnx_path}...")
+    tmp_path = f"{onnx_path}.{os.getpid()}.tmp"
+    sample = tokenizer(["export sample"], return_tensors="pt", padding=True)
+    dynamic_axes = {
+        "input_ids": {0: "batch", 1: "sequence"},
+        "attention_mask": {0: "batch", 1: "sequence"},
+        "logits": {0: "batch"},
+    }
+    with torch.no_grad():
+        torch.onnx.export(
+            _LogitsOnly(model).eval(),
+            (sample["input_ids"], sample["attention_mask"]),
+            tmp_path,
+            input_names=["input_ids", "attention_mask"],
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    os.replace(tmp_path, onnx_path)
+    if source_checksum:
+        with open(f"{onnx_path}.source.{os.getpid()}.tmp", "w") as f:
+            f.write(source_checksum)
+        os.replace(f"{onnx_path}.source.{os.getpid()}.tmp", onnx_path + ".source")
+    print("ONNX export complete!")
+
+
+def onnx_path_from_env():
+    return os.getenv("ONNX_MODEL_PATH", "./bias_model.onnx")
+
+
+def prepare_backend(name, model, tokenizer, source_checksum=None):
+    """Do the part of building a backend that is safe before fork(): the ONNX export"""
+    if name == "onnx" and onnx_export_stale(onnx_path_from_env(), source_checksum):
+        export_onnx(model, tokenizer, onnx_path_from_env(), source_checksum)
+
+
+def create_backend(name, model, tokenizer, token_budget=None, parallelism=None, source_checksum=None):
+    """
+    Build the backend selected by name (see BACKENDS).
+
+    source_checksum identifies the model (manifest["checksum"]); the onnx
+    backend re-exports when it differs from the one its file was built from,
+    and always exports when it is None.
+    """
+    bucketing = {
+        "token_budget": token_budget or int(os.getenv("BUCKET_TOKEN_BUDGET", "8192")),
+        "parallelism": parallelism or int(os.getenv("BUCKET_PARALLELISM", "1")),
+    }
+    if name == "torch":
+        return TorchBackend(model, tokenizer, **bucketing)
+    if name == "quantized":
+        return QuantizedTorchBackend(model, tokenizer, **bucketing)
+    if name == "onnx":
+        return OnnxBackend(
+            model,
+            tokenizer,
+            onnx_path=onnx_path_from_env(),
+            num_threads=os.getenv("ONNX_NUM_THREADS"),
+            source_checksum=source_checksum,
+            **bucketing,
+        )
+    raise ValueError(f"Unknown INFERENCE_BACKEND '{name}', expected one of {BACKENDS}")
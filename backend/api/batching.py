@@ -0,0 +1,202 @@
+"""
+Dynamic micro-batching for model inference.
+
+Concurrent callers submit small lists of texts; a single background thread
+collects them for up to `max_wait_ms`, runs one padded forward pass over the
+combined batch and hands each caller back its own slice of the results.
+
+Requests submitted with priority="background" (index refreshes) wait in a
+separate queue that is only served when no interactive request is queued,
+and predict() submits them one `max_batch_size` chunk at a time, so a large
+background job delays an interactive request by at most one batch.
+"""
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class _PendingRequest:
+    __slots__ = ("texts", "max_length", "future", "enqueued_at")
+
+    def __init__(self, texts, max_length):
+        self.texts = texts
+        self.max_length = max_length
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class MicroBatcher:
+    """Collect concurrent inference requests and run them as one batch"""
+
+    def __init__(self, predict_fn, max_batch_size=32, max_wait_ms=5):
+        # predict_fn(texts, max_length) -> list with one result per text
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._queue = deque()
+        self._background = deque()
+        self._running_items = 0  # texts in the batch being run right now
+        self._cond = threading.Condition()
+        self._thread = None
+        self._pid = None
+        self._stopped = False
+
+        # Simple counters, exposed through stats()
+        self.batches_run = 0
+        self.items_run = 0
+        self.requests_run = 0
+
+    # --- LIFECYCLE ---
+    def start(self):
+        """Start the batching thread (safe to call repeatedly and after fork)"""
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            # Threads do not survive fork(); drop anything inherited from the parent
+            if self._pid != os.getpid():
+                self._queue.clear()
+                self._background.clear()
+            self._stopped = False
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stop the batching thread after draining queued requests"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    # --- PUBLIC API ---
+    def submit(self, texts, max_length, priority="interactive"):
+        """Queue texts for inference and return a Future with one result per text"""
+        texts = list(texts)
+        request = _PendingRequest(texts, max_length)
+        if not texts:
+            request.future.set_result([])
+            return request.future
+
+        self.start()
+        with self._cond:
+            (self._background if priority == "background" else self._queue).append(request)
+            self._cond.notify()
+        return request.future
+
+    def predict(self, texts, max_length, priority="interactive"):
+        """Blocking helper around submit(); background texts go in max_batch_size chunks"""
+        if priority != "background":
+            return self.submit(texts, max_length).result()
+        texts = list(texts)
+        results = []
+        for start in range(0, len(texts), self.max_batch_size):
+            chunk = texts[start:start + self.max_batch_size]
+            results.extend(self.submit(chunk, max_length, priority).result())
+        return results
+
+    def load(self):
+        """Interactive texts waiting plus texts in the running batch"""
+        with self._cond:
+            return sum(len(r.texts) for r in self._queue) + self._running_items
+
+    def stats(self):
+        return {
+            "batches_run": self.batches_run,
+            "requests_run": self.requests_run,
+            "items_run": self.items_run,
+            "avg_batch_size": round(self.items_run / self.batches_run, 2) if self.batches_run else 0.0,
+            "queued_requests": len(self._queue),
+            "queued_background": len(self._background),
+            "running_items": self._running_items,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+        }
+
+    # --- WORKER LOOP ---
+    def _queued_items(self, max_length):
+        return sum(len(r.texts) for r in self._queue if r.max_length == max_length)
+
+    def _next_batch(self):
+        """Block until a batch is ready, then pop and return its requests"""
+        with self._cond:
+            while not self._queue:
+                if self._background:
+                    # Nothing interactive is waiting: run one background chunk
+                    return [self._background.popleft()]
+                if self._stopped:
+                    return None
+                self._cond.wait()
+
+            # Wait for more requests until the oldest one has waited max_wait
+            # or enough items with the same max_length are queued
+            head = self._queue[0]
+            deadline = head.enqueued_at + self.max_wait
+            while not self._stopped and self._queued_items(head.max_length) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            # Take requests sharing the head's max_length, always at least the head
+            batch, leftover, size = [], deque(), 0
+            while self._queue:
+                request = self._queue.popleft()
+                fits = size + len(request.texts) <= self.max_batch_size
+                if request.max_length == head.max_length and (not batch or fits):
+                    batch.append(request)
+                    size += len(request.texts)
+                else:
+                    leftover.append(request)
+            self._queue = leftover
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                # One bad request must never stop the thread every caller waits on
+                print(f"Micro-batcher error: {e}")
+
+    def _run_batch(self, batch):
+        # Drop requests whose caller gave up (client disconnect, timeout);
+        # their futures can no longer take a result
+        batch = [request for request in batch if request.future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        texts = [text for request in batch for text in request.texts]
+        self._running_items = len(texts)
+        try:
+            results = self.predict_fn(texts, batch[0].max_length)
+        except Exception as e:
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        finally:
+            self._running_items = 0
+
+        self.batches_run += 1
+        self.requests_run += len(batch)
+        self.items_run += len(texts)
+
+        offset = 0
+        for request in batch:
+            n = len(request.texts)
+            request.future.set_result(results[offset:offset + n])
+            offset += n
+
+def batcher_from_env(predict_fn):
+    """Build a MicroBatcher configured from BATCH_MAX_SIZE / BATCH_MAX_WAIT_MS"""
+    return MicroBatcher(
+        predict_fn,
+        max_batch_size=int(os.getenv("BATCH_MAX_SIZE", "32")),
+        max_wait_ms=float(os.getenv("BATCH_MAX_WAIT_MS", "5")),
+    )
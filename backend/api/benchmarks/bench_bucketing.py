@@ -0,0 +1,93 @@
+"""
+Length-bucketing benchmark.
+
+Classifies one large batch of seeded Reddit posts the way a big
+/classify_batch request would, once as a single padded tensor (the old
+behaviour) and once with length buckets, and reports padding waste, time
+and peak RSS. Each mode runs in a fresh subprocess so peak memory is not
+shared between runs.
+
+    python benchmarks/bench_bucketing.py --model ./bias_model_bundle --items 2000
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "database", "data", "unlabelled_data_clean.csv")
+UNBUCKETED = 10 ** 12  # a budget no batch can exceed: one bucket, padded to the longest text
+
+
+def run_mode(args):
+    """Child process: classify once and print a JSON result line"""
+    import pandas as pd
+    import torch
+
+    from backends import create_backend
+    from model_bundle import load_model
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    df = pd.read_csv(args.data)
+    texts = (df["title"].fillna("") + " " + df["body"].fillna("")).str.strip().tolist()
+    texts = [texts[i % len(texts)] for i in range(args.items)]
+
+    model, tokenizer, manifest = load_model(args.model)
+    backend = create_backend(
+        args.backend, model, tokenizer, token_budget=args.token_budget, parallelism=args.parallelism,
+        source_checksum=manifest["checksum"],
+    )
+    baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    start = time.perf_counter()
+    backend.predict(texts, max_length=args.max_length)
+    seconds = time.perf_counter() - start
+
+    stats = backend.stats()
+    stats["seconds"] = seconds
+    stats["peak_rss_increase_mb"] = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline_rss) / 1024
+    print(json.dumps(stats))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare padded vs length-bucketed batch inference")
+    parser.add_argument("--model", default="./bias_model_bundle", help="Bundle directory or legacy .pkl")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--backend", default="torch")
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--max-length", type=int, default=256)
+    parser.add_argument("--token-budget", type=int, default=8192)
+    parser.add_argument("--parallelism", type=int, default=1)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_mode(args)
+        return
+
+    results = {}
+    for label, budget in [("single tensor", UNBUCKETED), ("bucketed", args.token_budget)]:
+        cmd = [sys.executable, __file__, "--child", "--token-budget", str(budget)]
+        for flag in ["model", "data", "backend", "items", "max_length", "parallelism", "threads"]:
+            value = getattr(args, flag)
+            if value is not None:
+                cmd += [f"--{flag.replace('_', '-')}", str(value)]
+        output = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+        results[label] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"{args.items} posts, max_length={args.max_length}, backend={args.backend}\n")
+    print(f"{'mode':<15}{'buckets':>9}{'padding waste':>15}{'seconds':>10}{'peak RSS +MB':>14}")
+    for label, r in results.items():
+        print(f"{label:<15}{r['buckets_run']:>9}{r['padding_waste'] * 100:>14.1f}%"
+              f"{r['seconds']:>10.2f}{r['peak_rss_increase_mb']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Load test for the classification endpoints.
+
+Fires many concurrent single-post /classify_batch requests (the way the
+Chrome extension's scanPosts does) and reports throughput and latency.
+Run it against a live API with micro-batching on and off, e.g.
+
+    BATCH_MAX_SIZE=1 uvicorn combined_api:app   # baseline
+    BATCH_MAX_SIZE=32 uvicorn combined_api:app  # batched
+
+    python benchmarks/bench_classify_load.py --url http://localhost:8000 --requests 500 --concurrency 64
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+
+DATA_PATH = "../database/data/unlabelled_data_clean.csv"
+
+
+def load_texts(path, n):
+    df = pd.read_csv(path)
+    texts = (df["title"].fillna("") + " " + df["body"].fillna("")).str.strip()
+    texts = [t for t in texts if t]
+    return [texts[i % len(texts)] for i in range(n)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classification load test")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--endpoint", default="/classify_batch", choices=["/classify", "/classify_batch"])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--data", default=DATA_PATH)
+    args = parser.parse_args()
+
+    texts = load_texts(args.data, args.requests)
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency)
+    session.mount("http://", adapter)
+
+    def call(text):
+        body = {"texts": [text]} if args.endpoint == "/classify_batch" else {"text": text}
+        start = time.perf_counter()
+        res = session.post(args.url + args.endpoint, json=body, timeout=120)
+        res.raise_for_status()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        latencies = list(pool.map(call, texts))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    print(f"Requests:    {len(latencies)} @ concurrency {args.concurrency}")
+    print(f"Throughput:  {len(latencies) / elapsed:.1f} req/s")
+    print(f"Latency p50: {statistics.median(latencies) * 1000:.1f} ms")
+    print(f"Latency p95: {latencies[int(len(latencies) * 0.95) - 1] * 1000:.1f} ms")
+    print(f"Latency max: {latencies[-1] * 1000:.1f} ms")
+
+    health = session.get(args.url + "/health").json()
+    if "batching" in health:
+        print(f"Batching:    {health['batching']}")
+
+
+if __name__ == "__main__":
+    main()
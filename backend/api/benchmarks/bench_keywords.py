@@ -0,0 +1,84 @@
+"""
+Keyword extraction benchmark: KeyBERT vs the fast TF-IDF engine.
+
+Builds corpus statistics from the seeded posts (or loads --stats), then
+times both engines on the same texts and reports how often the fast
+engine's keywords agree with KeyBERT's.
+
+    python benchmarks/bench_keywords.py --limit 300
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from keyword_engine import CorpusStats, FastKeywordExtractor
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "database", "data", "unlabelled_data_clean.csv")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare KeyBERT and fast keyword extraction")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--stats", default=None, help="Saved keyword_stats.npz (default: build from --data)")
+    parser.add_argument("--limit", type=int, default=300)
+    parser.add_argument("--top-n", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    corpus = (df["title"].fillna("") + " " + df["body"].fillna("")).str.strip()
+    corpus = corpus[corpus.str.len() >= 10].tolist()
+    texts = corpus[:args.limit]
+
+    start = time.perf_counter()
+    stats = CorpusStats.load(args.stats) if args.stats else CorpusStats.build(corpus)
+    print(f"Corpus stats: {len(stats)} terms, {stats.n_docs} documents ({time.perf_counter() - start:.2f}s)")
+    fast = FastKeywordExtractor(stats)
+
+    from keybert import KeyBERT
+    kw_model = KeyBERT()
+    kw_model.extract_keywords(texts[0], top_n=args.top_n)  # warm up
+
+    keybert_ms, fast_ms = [], []
+    keybert_keywords, fast_keywords = [], []
+    for text in texts:
+        start = time.perf_counter()
+        keybert_keywords.append([w for w, _ in kw_model.extract_keywords(text, top_n=args.top_n)])
+        keybert_ms.append((time.perf_counter() - start) * 1000)
+
+        start = time.perf_counter()
+        fast_keywords.append(fast.extract(text, top_n=args.top_n))
+        fast_ms.append((time.perf_counter() - start) * 1000)
+
+    start = time.perf_counter()
+    for i in range(0, len(texts), args.batch_size):
+        fast.extract_batch(texts[i:i + args.batch_size], top_n=args.top_n)
+    fast_batch_rate = len(texts) / (time.perf_counter() - start)
+
+    # Agreement: share of KeyBERT keywords the fast engine also returns
+    overlaps = [len(set(k) & set(f)) / len(k) for k, f in zip(keybert_keywords, fast_keywords) if k]
+    any_shared = sum(bool(set(k) & set(f)) for k, f in zip(keybert_keywords, fast_keywords) if k)
+
+    print(f"\n{len(texts)} texts, top_n={args.top_n}")
+    print(f"{'engine':>8}{'p50 ms':>10}{'p95 ms':>10}")
+    for name, ms in (("keybert", keybert_ms), ("fast", fast_ms)):
+        ms = sorted(ms)
+        print(f"{name:>8}{statistics.median(ms):>10.2f}{ms[int(len(ms) * 0.95) - 1]:>10.2f}")
+    print(f"\nfast batch throughput (batch {args.batch_size}): {fast_batch_rate:.0f} texts/s")
+    print(f"speedup (p50): {statistics.median(keybert_ms) / statistics.median(fast_ms):.0f}x")
+    print(f"keyword overlap with KeyBERT: {statistics.mean(overlaps) * 100:.1f}% "
+          f"(at least one shared keyword in {any_shared / len(overlaps) * 100:.1f}% of texts)")
+
+    print("\nSamples:")
+    for text, k, f in list(zip(texts, keybert_keywords, fast_keywords))[:5]:
+        print(f"  {text[:70]!r}\n    keybert: {k}\n    fast:    {f}")
+
+
+if __name__ == "__main__":
+    main()
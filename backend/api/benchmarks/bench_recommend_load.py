@@ -0,0 +1,96 @@
+"""
+Load test for the recommendation path (/api/related then /api/recommend).
+
+Simulates users opening posts, as the extension does, so the bias
+threshold trips every few posts. Run the API against the fake Reddit
+client to benchmark offline without using the Reddit quota:
+
+    REDDIT_BACKEND=fake REDDIT_FAKE_LATENCY_MS=300 uvicorn combined_api:app
+
+    python benchmarks/bench_recommend_load.py --url http://localhost:8000 --users 50 --posts 20 --concurrency 16
+"""
+import argparse
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import requests
+
+DATA_PATH = "../database/data/unlabelled_data_clean.csv"
+
+
+def report(name, latencies):
+    if not latencies:
+        return
+    latencies = sorted(latencies)
+    print(f"{name:<16} n={len(latencies):<6} p50 {statistics.median(latencies) * 1000:8.1f} ms   "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recommendation path load test")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--posts", type=int, default=20, help="Posts opened per user")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data).fillna("")
+    rows = df[["title", "body"]].to_dict("records")
+    rng = random.Random(args.seed)
+
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=args.concurrency))
+
+    related_ms, recommend_ms, triggered_ms = [], [], []
+    errors = 0
+
+    def simulate_user(user):
+        nonlocal errors
+        # Each simulated user mostly reads one side, so thresholds trip
+        side = rng.choice(["left", "right"])
+        for _ in range(args.posts):
+            row = rng.choice(rows)
+            body = {
+                "user_id": f"bench-{user}",
+                "title": row["title"][:255],
+                "post": row["body"][:2000],
+                "label": side if rng.random() < 0.8 else "neutral",
+                "subreddit": "bench",
+            }
+            try:
+                start = time.perf_counter()
+                session.post(args.url + "/api/related", json=body, timeout=120).raise_for_status()
+                related_ms.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                res = session.post(args.url + "/api/recommend", json=body, timeout=120)
+                res.raise_for_status()
+                elapsed = time.perf_counter() - start
+                (triggered_ms if res.status_code == 200 else recommend_ms).append(elapsed)
+            except requests.RequestException:
+                errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        list(pool.map(simulate_user, range(args.users)))
+    elapsed = time.perf_counter() - start
+
+    total = len(related_ms) + len(recommend_ms) + len(triggered_ms)
+    print(f"Requests:   {total} in {elapsed:.1f}s ({total / elapsed:.1f} req/s), errors: {errors}")
+    report("/api/related", related_ms)
+    report("/api/recommend", recommend_ms)
+    report("  (triggered)", triggered_ms)
+
+    health = session.get(args.url + "/health").json()
+    for key in ("reddit_client", "search_cache", "pipeline_store"):
+        if key in health:
+            print(f"{key}: {health[key]}")
+
+
+if __name__ == "__main__":
+    main()
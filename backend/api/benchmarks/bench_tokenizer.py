@@ -0,0 +1,66 @@
+"""
+Tokenizer microbenchmark.
+
+Times the Python (slow) and Rust-backed (fast) RoBERTa tokenizers on the
+seeded Reddit posts at the batch sizes the API actually sees, and checks
+that both produce identical token ids.
+
+    python benchmarks/bench_tokenizer.py --tokenizer ./bias_model_bundle
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from model_bundle import load_tokenizer
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "database", "data", "unlabelled_data_clean.csv")
+
+
+def time_batches(tokenizer, texts, batch_size, max_length, repeats):
+    """Return per-batch latencies in ms over all texts, repeated"""
+    latencies = []
+    for _ in range(repeats):
+        for i in range(0, len(texts), batch_size):
+            batch = texts[i:i + batch_size]
+            start = time.perf_counter()
+            tokenizer(batch, truncation=True, max_length=max_length)
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare slow and fast RoBERTa tokenizers")
+    parser.add_argument("--tokenizer", default="./bias_model_bundle", help="Directory with tokenizer files")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--max-length", type=int, default=256)
+    parser.add_argument("--limit", type=int, default=512)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    df = pd.read_csv(args.data)
+    texts = (df["title"].fillna("") + " " + df["body"].fillna("")).str.strip().tolist()[:args.limit]
+
+    slow = load_tokenizer(args.tokenizer, fast=False)
+    fast = load_tokenizer(args.tokenizer, fast=True)
+
+    slow_ids = slow(texts, truncation=True, max_length=args.max_length)["input_ids"]
+    fast_ids = fast(texts, truncation=True, max_length=args.max_length)["input_ids"]
+    mismatches = sum(a != b for a, b in zip(slow_ids, fast_ids))
+    print(f"{len(texts)} texts, max_length={args.max_length}, id mismatches: {mismatches}\n")
+
+    print(f"{'batch':>6}{'slow p50 ms':>14}{'fast p50 ms':>14}{'speedup':>10}")
+    for batch_size in args.batch_sizes:
+        slow_ms = statistics.median(time_batches(slow, texts, batch_size, args.max_length, args.repeats))
+        fast_ms = statistics.median(time_batches(fast, texts, batch_size, args.max_length, args.repeats))
+        print(f"{batch_size:>6}{slow_ms:>14.3f}{fast_ms:>14.3f}{slow_ms / fast_ms:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,386 @@
+"""
+Per-user left/right counters behind recommend()'s BIAS_THRESHOLD check.
+
+BiasTracker keeps an in-memory LRU front of users, bounded by size and
+evicting users idle for `idle_seconds`. increment_and_check() counts in
+memory and does not wait on the database until a user's local count
+reaches the threshold. Increments are written behind in batches, every
+`flush_interval` seconds or once `flush_batch` users are dirty, to a
+durable store:
+
+- "mysql": the user_bias_counts table in the API database (DATABASE_URL),
+  created by migration 4 in backend/database/migrations.py
+- "sqlite": a local file, for single-node deployments
+- "memory": no persistence (the old defaultdict behaviour, but bounded);
+  the background thread then only evicts idle users
+
+Each flush applies increments with an atomic upsert (count = count + delta)
+and reads the totals back, so workers sharing the database converge within
+one flush interval. The threshold itself is decided by the store: the
+worker whose local count reaches it calls claim(), which adds its pending
+increments and resets the counts in one transaction, under the row lock,
+only if the stored total is at the threshold. Exactly one worker triggers
+per crossing, and increments from other workers are never overwritten.
+
+A user's first request loads their stored counts with ensure_loaded(),
+which reads through the async engine (db_pool.Database) when there is one.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, create_engine, select
+from sqlalchemy.sql import func
+
+
+class _UserCounts:
+    __slots__ = ("left", "right", "pending_left", "pending_right", "resets", "last_seen")
+
+    def __init__(self, left=0, right=0):
+        self.left = left
+        self.right = right
+        self.pending_left = 0
+        self.pending_right = 0
+        self.resets = 0  # bumped by every claim, so older flush totals are ignored
+        self.last_seen = time.monotonic()
+
+    @property
+    def dirty(self):
+        return self.pending_left or self.pending_right
+
+
+class SQLBiasStore:
+    """user_bias_counts table with upsert-based increments (MySQL or SQLite)"""
+
+    def __init__(self, engine, database=None):
+        self.engine = engine
+        self.database = database  # db_pool.Database for async reads, or None
+        self.metadata = MetaData()
+        self.table = Table(
+            "user_bias_counts",
+            self.metadata,
+            Column("user_id", String(255), primary_key=True),
+            Column("left_count", Integer, nullable=False, default=0),
+            Column("right_count", Integer, nullable=False, default=0),
+            Column("updated_at", DateTime, default=func.now(), onupdate=func.now()),
+        )
+        if engine.dialect.name == "mysql":
+            from sqlalchemy.dialects.mysql import insert
+        elif engine.dialect.name == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            raise ValueError(f"Unsupported bias tracker database '{engine.dialect.name}'")
+        self._insert = insert
+
+    def create_table(self):
+        """Only for the local SQLite file; on MySQL migration 4 creates the table"""
+        self.metadata.create_all(self.engine)
+
+    def _upsert(self, rows):
+        t = self.table
+        stmt = self._insert(t).values(rows)
+        if self.engine.dialect.name == "mysql":
+            new = stmt.inserted
+            return stmt.on_duplicate_key_update(
+                left_count=t.c.left_count + new.left_count,
+                right_count=t.c.right_count + new.right_count,
+                updated_at=func.now(),
+            )
+        new = stmt.excluded
+        return stmt.on_conflict_do_update(
+            index_elements=[t.c.user_id],
+            set_={
+                "left_count": t.c.left_count + new.left_count,
+                "right_count": t.c.right_count + new.right_count,
+                "updated_at": func.now(),
+            },
+        )
+
+    def _select(self, user_ids):
+        t = self.table
+        return select(t.c.user_id, t.c.left_count, t.c.right_count).where(t.c.user_id.in_(list(user_ids)))
+
+    def load(self, user_ids):
+        """Return {user_id: (left, right)} for users that have a row"""
+        with self.engine.connect() as conn:
+            rows = conn.execute(self._select(user_ids)).all()
+        return {row.user_id: (row.left_count, row.right_count) for row in rows}
+
+    async def load_async(self, user_ids):
+        """load() without blocking the event loop"""
+        if self.database is None:
+            return await asyncio.to_thread(self.load, user_ids)
+        rows = await self.database.fetch_all(self._select(user_ids))
+        return {row.user_id: (row.left_count, row.right_count) for row in rows}
+
+    def apply(self, changes):
+        """
+        Add {user_id: (left_delta, right_delta)} in one transaction and return
+        the resulting {user_id: (left, right)}.
+        """
+        rows = [{"user_id": uid, "left_count": dl, "right_count": dr} for uid, (dl, dr) in changes.items()]
+        with self.engine.begin() as conn:
+            conn.execute(self._upsert(rows))
+        return self.load(changes)
+
+    def claim(self, user_id, left_delta, right_delta, threshold):
+        """
+        Add a user's pending increments and, if a stored count has reached
+        threshold, reset both counts, all in one transaction.
+
+        Returns (bias, left, right) with the totals before any reset; bias is
+        None when the stored counts are below threshold (e.g. another worker
+        already claimed this crossing).
+        """
+        t = self.table
+        with self.engine.begin() as conn:
+            # The upsert locks the row until commit, so concurrent claims queue here
+            conn.execute(self._upsert([{"user_id": user_id, "left_count": left_delta, "right_count": right_delta}]))
+            row = conn.execute(self._select([user_id])).one()
+            left, right = row.left_count, row.right_count
+            bias = "left" if left >= threshold else "right" if right >= threshold else None
+            if bias:
+                conn.execute(
+                    t.update().where(t.c.user_id == user_id).values(left_count=0, right_count=0, updated_at=func.now())
+                )
+        return bias, left, right
+
+
+class BiasTracker:
+    """Bounded in-memory counters with batched write-behind to a store"""
+
+    def __init__(self, threshold, store=None, max_users=100000, idle_seconds=3600,
+                 flush_interval=1.0, flush_batch=500):
+        self.threshold = threshold
+        self.store = store
+        self.max_users = max(1, int(max_users))
+        self.idle_seconds = float(idle_seconds)
+        self.flush_interval = float(flush_interval)
+        self.flush_batch = max(1, int(flush_batch))
+        self._users = OrderedDict()
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._pid = None
+        self._running = False
+
+        self.loads = 0
+        self.flushes = 0
+        self.flushed_users = 0
+        self.flush_errors = 0
+        self.evicted = 0
+        self.triggered = 0
+        self.claims_lost = 0   # crossings another worker had already claimed
+
+    # --- BACKGROUND FLUSHING ---
+    def start(self):
+        if self._running and self._pid == os.getpid():
+            return
+        # Threads do not survive fork(); each worker starts its own flusher.
+        # The memory backend needs it too, for idle eviction.
+        self._running = True
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._run, name="bias-tracker-flush", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the flusher and write out everything still pending"""
+        self._running = False
+        self._wake.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def _run(self):
+        while self._running:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+            self._evict()
+
+    def flush(self):
+        """Write pending changes to the store and reconcile with its totals"""
+        if self.store is None:
+            return 0
+        with self._lock:
+            changes = {}
+            resets = {}
+            for uid in self._dirty:
+                counts = self._users[uid]
+                changes[uid] = (counts.pending_left, counts.pending_right)
+                resets[uid] = counts.resets
+                counts.pending_left = counts.pending_right = 0
+            self._dirty.clear()
+        if not changes:
+            return 0
+
+        try:
+            totals = self.store.apply(changes)
+        except Exception as e:
+            self.flush_errors += 1
+            print(f"Bias tracker flush error ({len(changes)} users, will retry): {e}")
+            with self._lock:
+                for uid, (dl, dr) in changes.items():
+                    counts = self._users[uid]
+                    self._dirty.add(uid)
+                    counts.pending_left += dl
+                    counts.pending_right += dr
+            return 0
+
+        with self._lock:
+            for uid, (left, right) in totals.items():
+                counts = self._users.get(uid)
+                if counts is None or counts.resets != resets[uid]:
+                    continue  # claimed meanwhile; these totals predate the reset
+                # Database totals (including other workers) plus what arrived since
+                counts.left = left + counts.pending_left
+                counts.right = right + counts.pending_right
+        self.flushes += 1
+        self.flushed_users += len(changes)
+        return len(changes)
+
+    def _evict(self):
+        now = time.monotonic()
+        with self._lock:
+            for uid in list(self._users):
+                counts = self._users[uid]
+                over_size = len(self._users) > self.max_users
+                if not over_size and now - counts.last_seen < self.idle_seconds:
+                    break  # LRU order: everyone after this was seen more recently
+                if counts.dirty:
+                    continue
+                del self._users[uid]
+                self.evicted += 1
+
+    # --- HOT PATH ---
+    async def ensure_loaded(self, user_id):
+        """Load a user's stored counts before increment_and_check() touches them"""
+        if self.store is None or user_id in self._users:
+            return
+        try:
+            left, right = (await self.store.load_async([user_id])).get(user_id, (0, 0))
+            self.loads += 1
+            loaded = _UserCounts(left, right)
+        except Exception as e:
+            print(f"Bias tracker load error for {user_id}, starting from zero: {e}")
+            loaded = _UserCounts()
+        with self._lock:
+            self._users.setdefault(user_id, loaded)
+
+    async def increment_and_check(self, user_id, leaning):
+        """
+        Count one post and check the threshold.
+
+        Returns (bias, left_count, right_count) where bias is the leaning that
+        reached BIAS_THRESHOLD (its counts are then reset) or None. Only the
+        crossing goes to the store, so each one triggers in exactly one worker.
+        """
+        if user_id not in self._users:
+            await self.ensure_loaded(user_id)
+
+        with self._lock:
+            counts = self._users.setdefault(user_id, _UserCounts())
+            self._users.move_to_end(user_id)
+            counts.last_seen = time.monotonic()
+
+            if leaning == "left":
+                counts.left += 1
+                counts.pending_left += 1
+            elif leaning == "right":
+                counts.right += 1
+                counts.pending_right += 1
+            left, right = counts.left, counts.right
+
+            bias = None
+            if left >= self.threshold:
+                bias = "left"
+            elif right >= self.threshold:
+                bias = "right"
+            claim = None
+            if bias and self.store is not None:
+                # The store decides, with the increments of every worker
+                claim = (counts.pending_left, counts.pending_right)
+                counts.pending_left = counts.pending_right = 0
+                counts.resets += 1
+            elif bias:
+                self.triggered += 1
+                counts.left = counts.right = 0
+                counts.pending_left = counts.pending_right = 0
+
+            if self.store is None:
+                counts.pending_left = counts.pending_right = 0  # nothing to write behind
+            elif counts.dirty:
+                self._dirty.add(user_id)
+            dirty = len(self._dirty)
+            over_size = len(self._users) > self.max_users
+
+        if dirty >= self.flush_batch or over_size:
+            self._wake.set()
+        if self.store is None and over_size:
+            self._evict()
+        if claim is not None:
+            return await self._claim(user_id, counts, *claim)
+        return bias, left, right
+
+    async def _claim(self, user_id, counts, left_delta, right_delta):
+        try:
+            bias, left, right = await asyncio.to_thread(
+                self.store.claim, user_id, left_delta, right_delta, self.threshold
+            )
+        except Exception as e:
+            print(f"Bias tracker claim error for {user_id}, will retry on the next post: {e}")
+            with self._lock:
+                counts.pending_left += left_delta
+                counts.pending_right += right_delta
+                self._dirty.add(user_id)
+            return None, counts.left, counts.right
+
+        with self._lock:
+            counts.resets += 1  # flushes started before the claim must not restore old totals
+            base_left, base_right = (0, 0) if bias else (left, right)
+            counts.left = base_left + counts.pending_left
+            counts.right = base_right + counts.pending_right
+        if bias:
+            self.triggered += 1
+        else:
+            self.claims_lost += 1
+        return bias, left, right
+
+    def stats(self):
+        return {
+            "backend": type(self.store).__name__ if self.store else "memory",
+            "users": len(self._users),
+            "loads": self.loads,
+            "flushes": self.flushes,
+            "flushed_users": self.flushed_users,
+            "flush_errors": self.flush_errors,
+            "evicted": self.evicted,
+            "thresholds_triggered": self.triggered,
+            "claims_lost": self.claims_lost,
+        }
+
+
+def bias_tracker_from_env(threshold, engine=None, database=None):
+    """Build a BiasTracker configured from BIAS_TRACKER_* variables"""
+    backend = os.getenv("BIAS_TRACKER_BACKEND", "mysql")
+    store = None
+    if backend == "mysql":
+        store = SQLBiasStore(engine, database)
+    elif backend == "sqlite":
+        path = os.getenv("BIAS_TRACKER_SQLITE_PATH", "./bias_tracker.db")
+        store = SQLBiasStore(create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False}))
+        store.create_table()
+    elif backend != "memory":
+        raise ValueError(f"Unknown BIAS_TRACKER_BACKEND '{backend}' (expected mysql, sqlite or memory)")
+
+    return BiasTracker(
+        threshold,
+        store=store,
+        max_users=int(os.getenv("BIAS_TRACKER_MAX_USERS", "100000")),
+        idle_seconds=float(os.getenv("BIAS_TRACKER_IDLE_SECONDS", "3600")),
+        flush_interval=float(os.getenv("BIAS_TRACKER_FLUSH_INTERVAL", "1.0")),
+        flush_batch=int(os.getenv("BIAS_TRACKER_FLUSH_BATCH", "500")),
+    )
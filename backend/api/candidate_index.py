@@ -0,0 +1,181 @@
+"""
+Local BM25 candidate index over the seeded `redditposts` and `newsarticles`.
+
+Every document is classified once when it is added, so a search returns
+posts in the same dict shape as search_and_classify() without calling
+Reddit or the model:
+
+    {"title", "leaning", "url", "upvotes", "comments", "subreddit"}
+
+The index grows incrementally: refresh_from_db() only reads rows past the
+last id seen for each table (the seeder gives both tables an AUTO_INCREMENT
+id), and add_documents() accepts new rows from anywhere else. Documents are
+de-duplicated on url.
+"""
+import heapq
+import math
+import re
+import threading
+from collections import defaultdict
+from urllib.parse import urlparse
+
+from sqlalchemy import text as sql_text
+
+TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9']*")
+STOP_WORDS = frozenset("""
+a about above after again against all am an and any are as at be because been before being below between
+both but by can could did do does doing down during each few for from further had has have having he her
+here hers herself him himself his how i if in into is it its itself just me more most my myself no nor not
+now of off on once only or other our ours ourselves out over own same she should so some such than that the
+their theirs them themselves then there these they this those through to too under until up very was we
+were what when where which while who whom why will with would you your yours yourself yourselves
+""".split())
+
+SOURCE_TABLES = ("redditposts", "newsarticles")
+SUBREDDIT_RE = re.compile(r"^/r/([^/]+)/")
+
+
+def tokenize(text):
+    return [t for t in TOKEN_RE.findall((text or "").lower()) if t not in STOP_WORDS]
+
+
+class BM25Index:
+    """In-memory inverted index with BM25 ranking"""
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings = defaultdict(dict)  # term -> {doc_id: term frequency}
+        self._doc_lengths = []
+        self._docs = []
+        self._urls = set()
+        self._total_length = 0
+        self._lock = threading.Lock()
+        self.offsets = {}  # table -> last id read by refresh_from_db()
+        self.ready = False
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add_documents(self, docs):
+        """Add classified post dicts (title, body, url, leaning, ...); returns how many were new"""
+        added = 0
+        with self._lock:
+            for doc in docs:
+                if not doc.get("url") or doc["url"] in self._urls:
+                    continue
+                terms = tokenize(f"{doc.get('title', '')} {doc.get('body', '')}")
+                doc_id = len(self._docs)
+                frequencies = defaultdict(int)
+                for term in terms:
+                    frequencies[term] += 1
+                for term, tf in frequencies.items():
+                    self._postings[term][doc_id] = tf
+
+                self._docs.append({
+                    "title": doc.get("title", ""),
+                    "leaning": doc["leaning"],
+                    "url": doc["url"],
+                    "upvotes": doc.get("upvotes", 0),
+                    "comments": doc.get("comments", 0),
+                    "subreddit": doc.get("subreddit", ""),
+                })
+                self._doc_lengths.append(len(terms))
+                self._total_length += len(terms)
+                self._urls.add(doc["url"])
+                added += 1
+        return added
+
+    def save_offsets(self):
+        """Nothing to persist; the index is rebuilt in memory on startup"""
+
+    def search(self, query, limit=50):
+        """Return up to `limit` documents ranked by BM25 score for query"""
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            n_docs = len(self._docs)
+            if n_docs == 0:
+                return []
+            avg_length = self._total_length / n_docs
+            scores = defaultdict(float)
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+            ranked = heapq.nlargest(limit, scores, key=scores.__getitem__)
+            return [dict(self._docs[doc_id]) for doc_id in ranked]
+
+    def stats(self):
+        return {
+            "ready": self.ready,
+            "documents": len(self._docs),
+            "terms": len(self._postings),
+            "offsets": dict(self.offsets),
+        }
+
+
+# --- LOADING FROM THE DATABASE ---
+def row_to_doc(table, row):
+    """Map a redditposts/newsarticles row to an (unclassified) document"""
+    permalink = row.get("permalink") or ""
+    if table == "redditposts":
+        match = SUBREDDIT_RE.match(permalink)
+        url = f"https://www.reddit.com{permalink}" if permalink else ""
+        source = match.group(1) if match else ""
+    else:
+        url = permalink
+        source = urlparse(permalink).netloc.replace("www.", "")
+    return {
+        "title": str(row.get("title") or ""),
+        "body": str(row.get("body") or ""),
+        "url": url,
+        "subreddit": source,
+    }
+
+
+def read_new_rows(engine, table, after_id, batch_size=2000):
+    """Yield lists of rows from `table` with id > after_id, in id order"""
+    while True:
+        # Keyset paging: each page is an index range scan, however far in
+        with engine.connect() as conn:
+            rows = conn.execute(
+                sql_text(f"SELECT id, title, permalink, body FROM {table} WHERE id > :after ORDER BY id LIMIT :limit"),
+                {"limit": batch_size, "after": after_id},
+            ).mappings().all()
+        if not rows:
+            return
+        yield [dict(r) for r in rows]
+        after_id = rows[-1]["id"]
+        if len(rows) < batch_size:
+            return
+
+
+def refresh_from_db(index, engine, classify_fn, tables=SOURCE_TABLES):
+    """
+    Add rows that arrived since the last refresh.
+
+    classify_fn(texts) -> list of leaning labels, called once per batch.
+    """
+    added = 0
+    for table in tables:
+        try:
+            for rows in read_new_rows(engine, table, index.offsets.get(table, 0)):
+                docs = [row_to_doc(table, row) for row in rows]
+                leanings = classify_fn([f"{d['title']} {d['body']}".strip() for d in docs])
+                for doc, leaning in zip(docs, leanings):
+                    doc["leaning"] = leaning
+                added += index.add_documents(docs)
+                index.offsets[table] = rows[-1]["id"]
+                index.save_offsets()
+        except Exception as e:
+            print(f"Candidate index refresh error for '{table}': {e}")
+    index.ready = True
+    return added
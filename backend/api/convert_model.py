@@ -0,0 +1,51 @@
+"""
+Convert the legacy pickled model into a safetensors model bundle.
+
+    python convert_model.py --pickle ./bias_model.pkl --out ./bias_model_bundle --version roberta-v2
+    python convert_model.py --pickle ./bias_model.pkl --out ./bias_model_bundle --version roberta-v2 --upload
+
+With --upload the bundle is copied to s3://<bucket>/<prefix>/ so the API can
+fetch it in load_model_from_s3().
+"""
+import argparse
+import os
+
+from model_bundle import MANIFEST_FILE, load_pickled_model, save_bundle
+
+
+def upload_bundle(bundle_dir, bucket, prefix):
+    import boto3
+
+    s3 = boto3.client("s3")
+    # Upload the manifest last so readers never see a manifest for a partial bundle
+    names = sorted(n for n in os.listdir(bundle_dir) if n != MANIFEST_FILE) + [MANIFEST_FILE]
+    for name in names:
+        key = f"{prefix.rstrip('/')}/{name}"
+        print(f"Uploading {name} → s3://{bucket}/{key}")
+        s3.upload_file(os.path.join(bundle_dir, name), bucket, key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert bias_model.pkl into a safetensors bundle")
+    parser.add_argument("--pickle", default="./bias_model.pkl")
+    parser.add_argument("--out", default="./bias_model_bundle")
+    parser.add_argument("--version", required=True, help="Model version recorded in the manifest")
+    parser.add_argument("--max-length", type=int, default=256)
+    parser.add_argument("--upload", action="store_true", help="Upload the bundle to S3")
+    parser.add_argument("--bucket", default="dsa3101-socialmedia02-model")
+    parser.add_argument("--prefix", default="bias_model_bundle")
+    args = parser.parse_args()
+
+    print(f"Loading {args.pickle}...")
+    model, tokenizer = load_pickled_model(args.pickle)
+
+    manifest = save_bundle(model, tokenizer, args.out, version=args.version, max_length=args.max_length)
+    print(f"Bundle written to {args.out} ({len(manifest['files'])} files, version {manifest['version']})")
+
+    if args.upload:
+        upload_bundle(args.out, args.bucket, args.prefix)
+        print("Upload complete!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Database engines with a configurable, instrumented connection pool.
+
+The API uses two engines on the same database:
+
+- a sync engine (pymysql) for the background writers and refreshers
+  (activity_writer, bias_tracker flushes, index refreshes)
+- an async engine (aiomysql under SQLAlchemy's asyncio extension) for
+  reads on the request path, so a request that waits on MySQL does not
+  hold a threadpool thread (request-path writes are queued to the
+  background writers instead)
+
+Both pools are sized by DB_POOL_* variables, and each reports its own
+metrics: checkout wait (avg, p95, max), connections in use (now and peak),
+overflow and checkout timeouts. The pool is sized by comparing them with
+request concurrency, e.g. a rising p95 wait or any timeouts mean the pool
+is too small for the load.
+
+If the async driver is missing or DB_ASYNC=0, fetch_all() runs the
+sync engine in the threadpool instead.
+"""
+import os
+import threading
+import time
+from collections import deque
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import QueuePool
+
+ASYNC_DRIVERS = {"pymysql": "aiomysql", "mysqldb": "aiomysql", "mysqlconnector": "aiomysql"}
+
+
+class PoolMetrics:
+    """Checkout wait times and timeouts of one pool (per worker process)"""
+
+    def __init__(self, window=1024):
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=window)
+        self.checkouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.waited = 0       # checkouts that had to wait for a connection
+        self.timeouts = 0
+        self.peak_in_use = 0
+
+    def record(self, wait, in_use):
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+            if wait > 0.001:
+                self.waited += 1
+            self._recent.append(wait)
+            self.peak_in_use = max(self.peak_in_use, in_use)
+
+    def record_timeout(self):
+        with self._lock:
+            self.timeouts += 1
+
+    def stats(self, pool):
+        with self._lock:
+            recent = sorted(self._recent)
+        return {
+            "size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(0, pool.overflow()),
+            "peak_in_use": self.peak_in_use,
+            "checkouts": self.checkouts,
+            "waited": self.waited,
+            "avg_wait_ms": round(1000 * self.total_wait / self.checkouts, 3) if self.checkouts else 0.0,
+            "p95_wait_ms": round(1000 * recent[int(len(recent) * 0.95) - 1], 3) if len(recent) > 1 else 0.0,
+            "max_wait_ms": round(1000 * self.max_wait, 3),
+            "timeouts": self.timeouts,
+        }
+
+
+def instrumented_pool(pool_class, metrics):
+    """Subclass of pool_class that records checkout waits and timeouts in metrics"""
+
+    class InstrumentedPool(pool_class):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                conn = super()._do_get()
+            except exc.TimeoutError:
+                metrics.record_timeout()
+                raise
+            metrics.record(time.perf_counter() - start, self.checkedout())
+            return conn
+
+    InstrumentedPool.__name__ = f"Instrumented{pool_class.__name__}"
+    return InstrumentedPool
+
+
+def async_url(url):
+    """DATABASE_URL with its MySQL driver swapped for the asyncio one"""
+    scheme, sep, rest = url.partition("://")
+    dialect, _, driver = scheme.partition("+")
+    if dialect != "mysql":
+        return None
+    return f"{dialect}+{ASYNC_DRIVERS.get(driver or 'mysqldb', 'aiomysql')}{sep}{rest}"
+
+
+class Database:
+    """Sync engine plus an optional async engine, both with instrumented pools"""
+
+    def __init__(self, url, async_database_url=None, use_async=True, pool_size=10, max_overflow=10,
+                 pool_timeout=5.0, pool_recycle=1800, pool_pre_ping=True):
+        self.url = url
+        self.metrics = PoolMetrics()
+        self.async_metrics = PoolMetrics()
+        options = dict(
+            pool_size=pool_size,
+            max_overflow=max_overflow,
+            pool_timeout=pool_timeout,
+            pool_recycle=pool_recycle,
+            pool_pre_ping=pool_pre_ping,
+        )
+        self.options = options
+
+        if url.startswith("sqlite"):
+            # SQLite pools are not sized; only MySQL gets the tuned pool
+            self.engine = create_engine(url)
+        else:
+            self.engine = create_engine(url, poolclass=instrumented_pool(QueuePool, self.metrics), **options)
+
+        self.async_engine = None
+        target = async_database_url or async_url(url)
+        if use_async and target:
+            try:
+                from sqlalchemy.ext.asyncio import create_async_engine
+                from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+                self.async_engine = create_async_engine(
+                    target, poolclass=instrumented_pool(AsyncAdaptedQueuePool, self.async_metrics), **options
+                )
+            except ImportError as e:
+                print(f"Async database driver unavailable, using the threadpool instead: {e}")
+
+    def dispose_after_fork(self):
+        """Drop pooled connections inherited from the parent process without closing them"""
+        self.engine.dispose(close=False)
+        if self.async_engine is not None:
+            self.async_engine.sync_engine.dispose(close=False)
+
+    async def dispose(self):
+        if self.async_engine is not None:
+            await self.async_engine.dispose()
+        self.engine.dispose()
+
+    # --- REQUEST PATH ---
+    def _fetch_sync(self, statement, params):
+        with self.engine.connect() as conn:
+            return conn.execute(statement, params or {}).all()
+
+    async def fetch_all(self, statement, params=None):
+        """Rows of a SELECT, without holding a thread while MySQL works"""
+        if self.async_engine is None:
+            return await run_in_threadpool(self._fetch_sync, statement, params)
+        async with self.async_engine.connect() as conn:
+            result = await conn.execute(statement, params or {})
+            return result.all()
+
+    def stats(self):
+        stats = {
+            "pool_size": self.options["pool_size"],
+            "max_overflow": self.options["max_overflow"],
+            "pool_timeout": self.options["pool_timeout"],
+            "async": self.async_engine is not None,
+        }
+        if isinstance(self.engine.pool, QueuePool):
+            stats["sync_pool"] = self.metrics.stats(self.engine.pool)
+        if self.async_engine is not None:
+            stats["async_pool"] = self.async_metrics.stats(self.async_engine.sync_engine.pool)
+        return stats
+
+
+def database_from_env(url):
+    """Build the API's Database configured from DB_* variables"""
+    return Database(
+        url,
+        async_database_url=os.getenv("ASYNC_DATABASE_URL") or None,
+        use_async=os.getenv("DB_ASYNC", "1") == "1",
+        pool_size=int(os.getenv("DB_POOL_SIZE", "10")),
+        max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        pool_timeout=float(os.getenv("DB_POOL_TIMEOUT", "5")),
+        pool_recycle=int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        pool_pre_ping=os.getenv("DB_POOL_PRE_PING", "1") == "1",
+    )
@@ -0,0 +1,253 @@
+"""
+Content-addressed cache for classification results.
+
+Entries are keyed on a hash of (model version, max_length, normalized text)
+and hold the class probability vector, so every inference path can share
+them. The in-process tier is a bounded LRU with a TTL; an optional SQLite
+tier on disk lets several uvicorn workers on one host reuse each other's
+results.
+
+SQLite never runs on the event loop: get_many_async() reads the disk tier
+in a worker thread, and writes (plus deleting expired rows every
+`purge_every` entries) go through one writer thread per process.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different copies share one entry"""
+    return " ".join((text or "").split())
+
+
+class _DiskTier:
+    """SQLite-backed shared tier (one file per host, WAL so workers don't block)"""
+
+    def __init__(self, path, ttl_seconds, purge_every=10000, max_pending=1000):
+        self.path = path
+        self.ttl = ttl_seconds
+        self.purge_every = max(1, int(purge_every))
+        self._writes = 0  # entries written since the last purge (per process)
+        self._pending = queue.Queue(maxsize=max(1, int(max_pending)))
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self.purged = 0
+        self.dropped = 0  # entries not written because the writer fell behind
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS classification_cache ("
+            " key TEXT PRIMARY KEY, probs TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def _conn(self):
+        # sqlite3 connections cannot be shared across threads or a fork
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get_many(self, keys):
+        if not keys:
+            return {}
+        oldest = time.time() - self.ttl
+        placeholders = ",".join("?" * len(keys))
+        rows = self._conn().execute(
+            f"SELECT key, probs FROM classification_cache WHERE key IN ({placeholders}) AND created_at >= ?",
+            [*keys, oldest],
+        ).fetchall()
+        return {key: json.loads(probs) for key, probs in rows}
+
+    def put_many(self, items):
+        """Queue items for the writer thread; never waits on SQLite"""
+        if not items:
+            return
+        self._start()
+        try:
+            self._pending.put_nowait(dict(items))
+        except queue.Full:
+            self.dropped += len(items)
+
+    def flush(self):
+        """Wait until everything queued so far is written"""
+        if self._thread is not None and self._pid == os.getpid():
+            self._pending.join()
+
+    def _start(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            # Threads do not survive fork(); each worker starts its own writer
+            self._pending = queue.Queue(maxsize=self._pending.maxsize)
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="classification-cache-writer", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            items = self._pending.get()
+            try:
+                self._write(items)
+            except sqlite3.Error as e:
+                print(f"Classification cache disk write error: {e}")
+            finally:
+                self._pending.task_done()
+
+    def _write(self, items):
+        now = time.time()
+        conn = self._conn()
+        conn.executemany(
+            "INSERT OR REPLACE INTO classification_cache (key, probs, created_at) VALUES (?, ?, ?)",
+            [(key, json.dumps(probs), now) for key, probs in items.items()],
+        )
+        self._writes += len(items)
+        if self._writes >= self.purge_every:
+            self._writes = 0
+            self.purge_expired()
+
+    def purge_expired(self):
+        cursor = self._conn().execute(
+            "DELETE FROM classification_cache WHERE created_at < ?", (time.time() - self.ttl,)
+        )
+        self.purged += cursor.rowcount
+        return cursor.rowcount
+
+
+class ClassificationCache:
+    """Bounded LRU + TTL cache of class probabilities keyed on text content"""
+
+    def __init__(self, model_version, max_entries=50000, ttl_seconds=24 * 3600, disk_path=None,
+                 disk_purge_every=10000):
+        self.model_version = str(model_version)
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl_seconds)
+        self._entries = OrderedDict()  # key -> (expires_at, probs)
+        self._lock = threading.Lock()
+        self._disk = _DiskTier(disk_path, self.ttl, disk_purge_every) if disk_path else None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def make_key(self, text, max_length):
+        raw = f"{self.model_version}\0{max_length}\0{normalize_text(text)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _get_memory(self, keys):
+        found, missing = {}, []
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] > now:
+                    self._entries.move_to_end(key)
+                    found[key] = entry[1]
+                else:
+                    if entry is not None:
+                        del self._entries[key]
+                    missing.append(key)
+        return found, missing
+
+    def get_many(self, keys):
+        """Return {key: probs} for every key that is cached and not expired (blocking)"""
+        found, missing = self._get_memory(keys)
+        if missing and self._disk is not None:
+            try:
+                from_disk = self._disk.get_many(missing)
+            except sqlite3.Error as e:
+                print(f"Classification cache disk read error: {e}")
+                from_disk = {}
+            self._add_from_disk(found, from_disk)
+        return self._count(keys, found)
+
+    async def get_many_async(self, keys):
+        """get_many() for the event loop: the disk tier is read in a worker thread"""
+        found, missing = self._get_memory(keys)
+        if missing and self._disk is not None:
+            try:
+                from_disk = await asyncio.to_thread(self._disk.get_many, missing)
+            except sqlite3.Error as e:
+                print(f"Classification cache disk read error: {e}")
+                from_disk = {}
+            self._add_from_disk(found, from_disk)
+        return self._count(keys, found)
+
+    def _add_from_disk(self, found, from_disk):
+        if from_disk:
+            self._store(from_disk)
+            found.update(from_disk)
+            self.disk_hits += len(from_disk)
+
+    def _count(self, keys, found):
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        """Store {key: probs} in memory and, when configured, on disk"""
+        self._store(items)
+        if self._disk is not None:
+            self._disk.put_many(items)
+
+    def _store(self, items):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for key, probs in items.items():
+                self._entries[key] = (expires_at, probs)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def flush(self):
+        """Wait for queued disk writes (tests, shutdown)"""
+        if self._disk is not None:
+            self._disk.flush()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "model_version": self.model_version,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "disk_tier": self._disk.path if self._disk is not None else None,
+            "disk_purged": self._disk.purged if self._disk is not None else 0,
+            "disk_dropped": self._disk.dropped if self._disk is not None else 0,
+        }
+
+
+def cache_from_env(model_version):
+    """Build a ClassificationCache configured from CLASSIFY_CACHE_* variables"""
+    return ClassificationCache(
+        model_version=os.getenv("MODEL_VERSION", model_version),
+        max_entries=int(os.getenv("CLASSIFY_CACHE_SIZE", "50000")),
+        ttl_seconds=float(os.getenv("CLASSIFY_CACHE_TTL", str(24 * 3600))),
+        disk_path=os.getenv("CLASSIFY_CACHE_PATH") or None,
+        disk_purge_every=int(os.getenv("CLASSIFY_CACHE_PURGE_EVERY", "10000")),
+    )
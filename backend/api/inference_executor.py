@@ -0,0 +1,135 @@
+"""
+Dedicated executor for model calls with a bounded wait queue.
+
+Model work (classification, keyword embedding) runs on a small pool of
+inference slots instead of FastAPI's shared 40-thread pool, so a burst of
+requests cannot pile onto PyTorch's intra-op thread pool. At most
+`slots + max_queue` calls are admitted at once; anything beyond that is
+rejected immediately with InferenceQueueFull, which the API turns into a
+429 with Retry-After.
+
+Classification goes through the MicroBatcher, whose single thread already
+serializes forward passes. run_batched() awaits the batcher's future on
+the event loop instead of parking a slot thread on it, so up to
+`max_batched` concurrent requests (not just `slots`) can share a batch.
+"""
+import asyncio
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class InferenceQueueFull(Exception):
+    """Raised when every inference slot is busy and the wait queue is full"""
+
+    def __init__(self, retry_after):
+        super().__init__("Inference queue is full, retry later")
+        self.retry_after = retry_after
+
+
+class InferenceExecutor:
+    """Run blocking model calls on dedicated threads with admission control"""
+
+    def __init__(self, slots=4, max_queue=64, retry_after=1, max_batched=None):
+        self.slots = max(1, int(slots))
+        self.max_queue = max(0, int(max_queue))
+        self.retry_after = int(retry_after)
+        self.max_batched = self.slots + self.max_queue if max_batched is None else max(1, int(max_batched))
+        self._pool = None
+        self._pid = None
+        self._admitted = 0
+        self._batched = 0
+        self._lock = threading.Lock()
+
+        self.completed = 0
+        self.completed_batched = 0
+        self.rejected = 0
+        self.total_wait = 0.0
+
+    def _executor(self):
+        # Created lazily (and re-created after fork) since threads do not survive fork()
+        if self._pool is None or self._pid != os.getpid():
+            self._pool = ThreadPoolExecutor(max_workers=self.slots, thread_name_prefix="inference")
+            self._pid = os.getpid()
+            self._admitted = 0
+        return self._pool
+
+    def _admit(self):
+        with self._lock:
+            if self._admitted >= self.slots + self.max_queue:
+                self.rejected += 1
+                raise InferenceQueueFull(self.retry_after)
+            self._admitted += 1
+
+    def _release(self):
+        with self._lock:
+            self._admitted -= 1
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on an inference slot, or raise InferenceQueueFull"""
+        pool = self._executor()
+        self._admit()
+        submitted = time.monotonic()
+
+        def timed():
+            self.total_wait += time.monotonic() - submitted
+            return fn(*args, **kwargs)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, timed)
+        finally:
+            self._release()
+            self.completed += 1
+
+    async def run_batched(self, submit, *args, **kwargs):
+        """
+        Await the concurrent Future returned by submit(*args, **kwargs)
+        (e.g. MicroBatcher.submit) on the event loop, or raise
+        InferenceQueueFull once max_batched calls are waiting
+        """
+        with self._lock:
+            if self._batched >= self.max_batched:
+                self.rejected += 1
+                raise InferenceQueueFull(self.retry_after)
+            self._batched += 1
+        try:
+            return await asyncio.wrap_future(submit(*args, **kwargs))
+        finally:
+            with self._lock:
+                self._batched -= 1
+            self.completed_batched += 1
+
+    def idle_slots(self):
+        """Slots not taken by admitted calls (running or queued)"""
+        return max(0, self.slots - self._admitted)
+
+    def shutdown(self):
+        if self._pool is not None and self._pid == os.getpid():
+            self._pool.shutdown(wait=True)
+        self._pool = None
+
+    def stats(self):
+        in_flight = self._admitted
+        return {
+            "slots": self.slots,
+            "max_queue": self.max_queue,
+            "running": min(in_flight, self.slots),
+            "queued": max(0, in_flight - self.slots),
+            "completed": self.completed,
+            "batched_waiting": self._batched,
+            "max_batched": self.max_batched,
+            "completed_batched": self.completed_batched,
+            "rejected": self.rejected,
+            "avg_queue_wait_ms": round(self.total_wait / self.completed * 1000, 2) if self.completed else 0.0,
+        }
+
+
+def executor_from_env():
+    """Build an InferenceExecutor configured from INFERENCE_* variables"""
+    return InferenceExecutor(
+        slots=int(os.getenv("INFERENCE_SLOTS", "4")),
+        max_queue=int(os.getenv("INFERENCE_MAX_QUEUE", "64")),
+        retry_after=int(os.getenv("INFERENCE_RETRY_AFTER", "1")),
+        max_batched=int(os.getenv("INFERENCE_MAX_BATCHED")) if os.getenv("INFERENCE_MAX_BATCHED") else None,
+    )
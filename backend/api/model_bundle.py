@@ -0,0 +1,195 @@
+"""
+Model bundle format and loaders.
+
+A bundle is a directory holding
+
+    manifest.json       label map, max_length, version, file checksums
+    config.json         HuggingFace model config
+    model.safetensors   weights
+    tokenizer files     vocab.json, merges.txt, tokenizer_config.json, ...
+
+Weights are memory-mapped straight from model.safetensors instead of being
+unpickled into fresh heap memory. The mapping is private copy-on-write, so
+every worker on a host reads the same pages from the OS page cache until
+(if ever) a tensor is written to.
+"""
+import hashlib
+import json
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+from datetime import datetime, timezone
+
+import torch
+from transformers import AutoConfig, AutoModelForSequenceClassification, RobertaTokenizer, RobertaTokenizerFast
+
+MANIFEST_FILE = "manifest.json"
+WEIGHTS_FILE = "model.safetensors"
+DEFAULT_LABEL_MAP = {0: "left", 1: "neutral", 2: "right"}
+
+_SAFETENSORS_DTYPES = {
+    "F64": torch.float64,
+    "F32": torch.float32,
+    "F16": torch.float16,
+    "BF16": torch.bfloat16,
+    "I64": torch.int64,
+    "I32": torch.int32,
+    "I16": torch.int16,
+    "I8": torch.int8,
+    "U8": torch.uint8,
+    "BOOL": torch.bool,
+}
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def read_manifest(bundle_dir):
+    with open(os.path.join(bundle_dir, MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    manifest["label_map"] = {int(k): v for k, v in manifest["label_map"].items()}
+    return manifest
+
+
+def is_bundle(path):
+    return os.path.isdir(path) and os.path.exists(os.path.join(path, MANIFEST_FILE))
+
+
+# --- WRITING ---
+def save_bundle(model, tokenizer, bundle_dir, version, max_length=256, label_map=None):
+    """Write model + tokenizer as a safetensors bundle with a manifest"""
+    os.makedirs(bundle_dir, exist_ok=True)
+    model.save_pretrained(bundle_dir, safe_serialization=True)
+    tokenizer.save_pretrained(bundle_dir)
+
+    files = {
+        name: file_sha256(os.path.join(bundle_dir, name))
+        for name in sorted(os.listdir(bundle_dir))
+        if name != MANIFEST_FILE and os.path.isfile(os.path.join(bundle_dir, name))
+    }
+    manifest = {
+        "format_version": 1,
+        "version": version,
+        "model_class": type(model).__name__,
+        "max_length": max_length,
+        "label_map": {str(k): v for k, v in (label_map or DEFAULT_LABEL_MAP).items()},
+        "files": files,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(os.path.join(bundle_dir, MANIFEST_FILE), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+# --- LOADING ---
+def use_fast_tokenizer():
+    return os.getenv("TOKENIZER_FAST", "true").lower() == "true"
+
+
+def load_tokenizer(tokenizer_dir, fast=None):
+    """Load the Rust-backed fast tokenizer, falling back to the Python one"""
+    fast = use_fast_tokenizer() if fast is None else fast
+    if fast:
+        try:
+            return RobertaTokenizerFast.from_pretrained(tokenizer_dir)
+        except Exception as e:
+            print(f"Fast tokenizer unavailable ({e}), using slow tokenizer")
+    return RobertaTokenizer.from_pretrained(tokenizer_dir)
+
+
+def to_fast_tokenizer(tokenizer):
+    """Convert an in-memory slow tokenizer (e.g. from the pickle) to a fast one"""
+    if getattr(tokenizer, "is_fast", False) or not use_fast_tokenizer():
+        return tokenizer
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        tokenizer.save_pretrained(tmp_dir)
+        return load_tokenizer(tmp_dir, fast=True)
+
+
+def mmap_safetensors(path):
+    """
+    Return {name: tensor} backed by a private memory map of a safetensors file.
+
+    Layout: 8-byte little-endian header size, JSON header, raw tensor data.
+    """
+    with open(path, "rb") as f:
+        header_size = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(header_size))
+        # ACCESS_COPY: writable (torch.frombuffer needs that) but never written back,
+        # and untouched pages stay shared through the page cache
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    data_start = 8 + header_size
+    tensors = {}
+    for name, info in header.items():
+        if name == "__metadata__":
+            continue
+        begin, end = info["data_offsets"]
+        dtype = _SAFETENSORS_DTYPES[info["dtype"]]
+        if end == begin:
+            tensors[name] = torch.empty(info["shape"], dtype=dtype)
+            continue
+        flat = torch.frombuffer(buffer, dtype=dtype, count=(end - begin) // dtype.itemsize, offset=data_start + begin)
+        tensors[name] = flat.view(info["shape"])
+    return tensors
+
+
+def load_bundle(bundle_dir):
+    """Load (model, tokenizer, manifest) from a bundle, mapping weights from disk"""
+    manifest = read_manifest(bundle_dir)
+    manifest["checksum"] = manifest["files"][WEIGHTS_FILE]
+    config = AutoConfig.from_pretrained(bundle_dir)
+
+    # Build the module without running weight init; its placeholder tensors are
+    # never touched and get replaced by the mapped ones below
+    from transformers.modeling_utils import no_init_weights
+    with no_init_weights():
+        model = AutoModelForSequenceClassification.from_config(config)
+
+    state_dict = mmap_safetensors(os.path.join(bundle_dir, WEIGHTS_FILE))
+    missing, unexpected = model.load_state_dict(state_dict, strict=False, assign=True)
+    if missing:
+        raise RuntimeError(f"Model bundle is missing weights: {missing}")
+    if unexpected:
+        print(f"Ignoring unexpected weights in bundle: {unexpected}")
+    model.tie_weights()
+    model.eval()
+
+    tokenizer = load_tokenizer(bundle_dir)
+    return model, tokenizer, manifest
+
+
+def load_pickled_model(path):
+    """Load the {'model', 'tokenizer'} dict produced by the training notebook"""
+    with open(path, "rb") as f:
+        saved_data = pickle.load(f)
+    model = saved_data["model"]
+    model.eval()
+    return model, saved_data["tokenizer"]
+
+
+def load_model(path):
+    """
+    Load (model, tokenizer, manifest) from a bundle directory or a legacy pickle.
+
+    manifest["checksum"] is the SHA-256 of the weights (or of the pickle), so
+    files derived from the model, like the ONNX export, can tell it changed.
+    """
+    if is_bundle(path):
+        return load_bundle(path)
+    model, tokenizer = load_pickled_model(path)
+    tokenizer = to_fast_tokenizer(tokenizer)
+    manifest = {
+        "version": os.path.basename(path),
+        "checksum": file_sha256(path),
+        "max_length": 256,
+        "label_map": dict(DEFAULT_LABEL_MAP),
+    }
+    return model, tokenizer, manifest
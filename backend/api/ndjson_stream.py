@@ -0,0 +1,128 @@
+"""
+Helpers for newline-delimited JSON streaming.
+
+`/classify_stream` reads its request body line by line, groups the parsed
+lines into small batches and writes each batch's results back as soon as
+they are ready. Only one bounded queue of lines and one batch are held in
+memory at a time, however large the upload is.
+"""
+import asyncio
+import json
+
+from starlette.responses import StreamingResponse
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class NDJSONStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose body iterator may still be reading the request body.
+
+    Starlette's StreamingResponse listens on receive() for disconnects while
+    streaming, which would swallow the request body chunks we are consuming.
+    """
+
+    def __init__(self, content, **kwargs):
+        kwargs.setdefault("media_type", NDJSON_MEDIA_TYPE)
+        super().__init__(content, **kwargs)
+
+    async def __call__(self, scope, receive, send):
+        await self.stream_response(send)
+        if self.background is not None:
+            await self.background()
+
+
+class StreamLine:
+    """One parsed input line: an id plus either the text or a parse error"""
+
+    __slots__ = ("line_no", "id", "text", "error")
+
+    def __init__(self, line_no, id=None, text=None, error=None):
+        self.line_no = line_no
+        self.id = id
+        self.text = text
+        self.error = error
+
+
+def parse_line(line_no, raw):
+    try:
+        obj = json.loads(raw)
+    except ValueError as e:
+        return StreamLine(line_no, error=f"invalid JSON: {e}")
+    if not isinstance(obj, dict):
+        return StreamLine(line_no, error="each line must be a JSON object")
+    text = obj.get("text")
+    item_id = obj.get("id", line_no)
+    if not isinstance(text, str):
+        return StreamLine(line_no, id=item_id, error="'text' must be a string")
+    return StreamLine(line_no, id=item_id, text=text)
+
+
+async def read_ndjson(request, max_line_bytes=1024 * 1024):
+    """Yield a StreamLine for every non-empty line of the request body as it arrives"""
+    buffer = b""
+    line_no = 0
+    async for chunk in request.stream():
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for raw in lines:
+            if raw.strip():
+                yield parse_line(line_no, raw)
+                line_no += 1
+        if len(buffer) > max_line_bytes:
+            yield StreamLine(line_no, error=f"line exceeds {max_line_bytes} bytes")
+            return
+    if buffer.strip():
+        yield parse_line(line_no, buffer)
+
+
+async def batched(items, batch_size, max_wait_ms):
+    """
+    Group an async iterator into lists of up to batch_size items.
+
+    A partial batch is released once its first item has waited max_wait_ms,
+    so slow uploads still get results back promptly.
+    """
+    queue = asyncio.Queue(maxsize=batch_size * 2)
+    done = object()
+    max_wait = max_wait_ms / 1000.0
+
+    async def produce():
+        try:
+            async for item in items:
+                await queue.put(item)
+        finally:
+            await queue.put(done)
+
+    producer = asyncio.create_task(produce())
+    loop = asyncio.get_running_loop()
+    try:
+        finished = False
+        while not finished:
+            item = await queue.get()
+            if item is done:
+                break
+            batch = [item]
+            deadline = loop.time() + max_wait
+            while len(batch) < batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is done:
+                    finished = True
+                    break
+                batch.append(item)
+            yield batch
+        # Surface body read errors (e.g. client disconnect) from the producer
+        if producer.done() and producer.exception() is not None:
+            raise producer.exception()
+    finally:
+        producer.cancel()
+
+
+def ndjson_line(obj):
+    return (json.dumps(obj) + "\n").encode("utf-8")
@@ -0,0 +1,89 @@
+"""
+Backend parity check.
+
+Classifies the seeded Reddit posts with the reference eager PyTorch model
+and with each candidate backend, then reports label agreement, probability
+drift and speed so a backend can be switched on safely.
+
+    python parity_check.py --backends quantized onnx
+    python parity_check.py --limit 200 --max-length 512
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+import torch
+
+from backends import BACKENDS, create_backend
+from model_bundle import load_model
+
+DATA_PATH = "../database/data/unlabelled_data_clean.csv"
+LABELS = ["left", "neutral", "right"]
+
+
+def load_texts(path, limit=None):
+    df = pd.read_csv(path)
+    texts = (df["title"].fillna("") + " " + df["body"].fillna("")).str.strip()
+    texts = [t for t in texts if t]
+    return texts[:limit] if limit else texts
+
+
+def run_backend(backend, texts, batch_size, max_length):
+    """Return (probs array, seconds) for all texts"""
+    probs = []
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        probs.extend(backend.predict(texts[i:i + batch_size], max_length=max_length))
+    return np.asarray(probs), time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare inference backends against eager PyTorch")
+    parser.add_argument("--model", default="./bias_model_bundle", help="Bundle directory or legacy .pkl")
+    parser.add_argument("--data", default=DATA_PATH)
+    parser.add_argument("--backends", nargs="+", default=["quantized", "onnx"], choices=BACKENDS)
+    parser.add_argument("--limit", type=int, default=None, help="Only use the first N posts")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-length", type=int, default=256)
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads for all backends")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    texts = load_texts(args.data, args.limit)
+    print(f"Loaded {len(texts)} posts from {args.data}")
+
+    model, tokenizer, manifest = load_model(args.model)
+    reference = create_backend("torch", model, tokenizer)
+    ref_probs, ref_seconds = run_backend(reference, texts, args.batch_size, args.max_length)
+    ref_labels = ref_probs.argmax(axis=1)
+    print(f"\nReference (torch): {len(texts) / ref_seconds:.1f} posts/s")
+
+    for name in args.backends:
+        if name == "torch":
+            continue
+        backend = create_backend(name, model, tokenizer, source_checksum=manifest["checksum"])
+        probs, seconds = run_backend(backend, texts, args.batch_size, args.max_length)
+        labels = probs.argmax(axis=1)
+        drift = np.abs(probs - ref_probs)
+
+        print(f"\n{'='*50}")
+        print(f"Backend: {name}")
+        print(f"  Throughput:        {len(texts) / seconds:.1f} posts/s ({ref_seconds / seconds:.2f}x torch)")
+        print(f"  Label agreement:   {(labels == ref_labels).mean() * 100:.2f}%")
+        print(f"  Max prob drift:    {drift.max():.5f}")
+        print(f"  Mean prob drift:   {drift.mean():.5f}")
+        for i, label in enumerate(LABELS):
+            mask = ref_labels == i
+            if mask.any():
+                print(f"  Agreement on {label:<8} {(labels[mask] == i).mean() * 100:.2f}% of {mask.sum()}")
+
+        disagreements = np.flatnonzero(labels != ref_labels)[:5]
+        for idx in disagreements:
+            print(f"  - [{LABELS[ref_labels[idx]]} -> {LABELS[labels[idx]]}] {texts[idx][:80]}")
+
+
+if __name__ == "__main__":
+    main()
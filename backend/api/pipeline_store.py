@@ -0,0 +1,88 @@
+"""
+Short-lived store of per-post pipeline results.
+
+The extension calls /api/related and then /api/recommend for the same post.
+Both endpoints look up one PipelineEntry keyed on (user_id, hash of the
+title + post), so the second request reuses what the first computed:
+
+- the PreparedText (tokenization, KeyBERT/sentence embeddings)
+- extracted keywords and the classified candidate posts
+- the handle of the user_activity row /api/related queued, so /api/recommend
+  updates exactly that row (see activity_writer.py)
+
+Entries live for `ttl` seconds (LRU-bounded) and are per worker process.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from inference_cache import normalize_text
+from prepared_text import PreparedText
+
+
+def post_key(user_id, title, post):
+    digest = hashlib.sha1(normalize_text(f"{title}\n{post}").encode("utf-8")).hexdigest()
+    return (user_id, digest)
+
+
+class PipelineEntry:
+    """Intermediate results for one user's post"""
+
+    __slots__ = ("prepared", "keywords", "posts", "activity", "created_at")
+
+    def __init__(self, text):
+        self.prepared = PreparedText(text)
+        self.keywords = None     # list of keywords, [] when none were found
+        self.posts = None        # classified search results for the keywords
+        self.activity = None     # ActivityHandle of the row added by /api/related
+        self.created_at = time.monotonic()
+
+
+class PipelineStore:
+    """TTL + LRU map of post_key -> PipelineEntry"""
+
+    def __init__(self, ttl_seconds=300, max_entries=10000):
+        self.ttl = float(ttl_seconds)
+        self.max_entries = max(1, int(max_entries))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_create(self, user_id, title, post):
+        """Return the live entry for this post, creating it if needed"""
+        key = post_key(user_id, title, post)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry.created_at < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry
+
+            self.misses += 1
+            entry = PipelineEntry((title + " " + post).strip())
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def pipeline_store_from_env():
+    """Build a PipelineStore configured from PIPELINE_STORE_* variables"""
+    return PipelineStore(
+        ttl_seconds=float(os.getenv("PIPELINE_STORE_TTL", "300")),
+        max_entries=int(os.getenv("PIPELINE_STORE_SIZE", "10000")),
+    )
@@ -0,0 +1,135 @@
+"""
+Speculative prefetch of counter-recommendations.
+
+When a user's left/right count gets within PREFETCH_DISTANCE of
+BIAS_THRESHOLD, recommend() schedules find_counter_posts() in the
+background. When the threshold trips, the stored result is served, or the
+still-running prefetch is awaited, instead of starting the chain from
+scratch.
+
+Prefetches are bounded: at most `workers` run at once and `max_pending`
+are queued. Each waits until the inference executor has spare slots, and
+its Reddit calls use background priority, so interactive requests always
+come first. Results are per worker process and expire after `ttl`.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+
+class RecommendationPrefetcher:
+    """Bounded background computation of per-(user, bias) recommendations"""
+
+    def __init__(self, workers=1, max_pending=32, ttl_seconds=600, max_results=10000,
+                 start_timeout=10.0, can_start=None):
+        self.workers = max(1, int(workers))
+        self.max_pending = max(1, int(max_pending))
+        self.ttl = float(ttl_seconds)
+        self.max_results = max(1, int(max_results))
+        self.start_timeout = float(start_timeout)
+        self.can_start = can_start or (lambda: True)
+        self._semaphore = None
+        self._pending = {}            # (user_id, bias) -> asyncio.Task
+        self._results = OrderedDict()  # (user_id, bias) -> (stored_at, recommendations)
+
+        self.scheduled = 0
+        self.dropped = 0
+        self.completed = 0
+        self.errors = 0
+        self.hits = 0
+        self.joined = 0
+        self.misses = 0
+
+    def _fresh(self, key):
+        entry = self._results.get(key)
+        return entry is not None and time.monotonic() - entry[0] < self.ttl
+
+    def schedule(self, user_id, bias, compute):
+        """Start `await compute()` in the background unless already done, running or over capacity"""
+        key = (user_id, bias)
+        if key in self._pending or self._fresh(key):
+            return False
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return False
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.workers)
+
+        self.scheduled += 1
+        task = asyncio.create_task(self._run(key, compute))
+        self._pending[key] = task
+        return True
+
+    async def _run(self, key, compute):
+        try:
+            async with self._semaphore:
+                # Only start while interactive traffic leaves the model idle
+                waited = 0.0
+                while not self.can_start():
+                    if waited >= self.start_timeout:
+                        self.dropped += 1
+                        return
+                    await asyncio.sleep(0.05)
+                    waited += 0.05
+
+                recommendations = await compute()
+                if recommendations:
+                    self._results[key] = (time.monotonic(), recommendations)
+                    self._results.move_to_end(key)
+                    while len(self._results) > self.max_results:
+                        self._results.popitem(last=False)
+                self.completed += 1
+        except Exception as e:
+            self.errors += 1
+            print(f"Prefetch error for user {key[0]}: {e}")
+        finally:
+            self._pending.pop(key, None)
+
+    async def take(self, user_id, bias, wait_seconds=0.0):
+        """
+        Return and remove the prefetched recommendations (None on a miss).
+
+        A prefetch still running for this key is awaited for up to wait_seconds.
+        """
+        key = (user_id, bias)
+        task = self._pending.get(key)
+        if task is not None and wait_seconds > 0:
+            try:
+                await asyncio.wait_for(asyncio.shield(task), wait_seconds)
+                self.joined += 1
+            except asyncio.TimeoutError:
+                pass
+
+        fresh = self._fresh(key)
+        entry = self._results.pop(key, None)
+        if entry is None or not fresh:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def stats(self):
+        served = self.hits + self.misses
+        return {
+            "pending": len(self._pending),
+            "stored": len(self._results),
+            "scheduled": self.scheduled,
+            "dropped": self.dropped,
+            "completed": self.completed,
+            "errors": self.errors,
+            "hits": self.hits,
+            "joined_in_flight": self.joined,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / served, 4) if served else 0.0,
+        }
+
+
+def prefetcher_from_env(can_start=None):
+    """Build a RecommendationPrefetcher configured from PREFETCH_* variables"""
+    return RecommendationPrefetcher(
+        workers=int(os.getenv("PREFETCH_WORKERS", "1")),
+        max_pending=int(os.getenv("PREFETCH_MAX_PENDING", "32")),
+        ttl_seconds=float(os.getenv("PREFETCH_TTL", "600")),
+        can_start=can_start,
+    )
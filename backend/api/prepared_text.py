@@ -0,0 +1,36 @@
+"""
+Per-request text with reusable tokenization results.
+
+A request's title+post text is tokenized for the classifier and embedded
+for KeyBERT. PreparedText carries those results along the request pipeline
+(and, via the pipeline store, to a follow-up request for the same post) so
+each is computed at most once.
+"""
+
+
+class PreparedText:
+    """A text plus lazily computed, memoized encodings"""
+
+    __slots__ = ("text", "_encodings", "keybert_embeddings", "embedding")
+
+    def __init__(self, text):
+        self.text = text or ""
+        self._encodings = {}  # max_length -> classifier feature dict
+        self.keybert_embeddings = None  # (doc_embeddings, word_embeddings)
+        self.embedding = None  # sentence embedding for vector retrieval
+
+    def __str__(self):
+        return self.text
+
+    def encoding(self, encode_fn, max_length):
+        """Return the classifier tokenization for max_length, computing it once"""
+        features = self._encodings.get(max_length)
+        if features is None:
+            features = encode_fn([self.text], max_length)[0]
+            self._encodings[max_length] = features
+        return features
+
+
+def as_text(item):
+    """Plain string for either a str or a PreparedText"""
+    return item.text if isinstance(item, PreparedText) else item
@@ -0,0 +1,128 @@
+"""
+Cache of final recommendation sets.
+
+Users drifting toward the same leaning on the same story produce the same
+keywords, so the selected posts are cached on
+(normalized keyword set, per-leaning quotas), e.g.
+
+    (("election", "senate", "vote"), (("neutral", 2), ("right", 2)))
+
+Each entry keeps a pool of up to `pool_factor * k` candidates per leaning.
+Hits draw k of them according to `rotation`:
+
+- "rotate": consecutive hits step through the pool
+- "shuffle": a random sample, kept in ranking order
+- "none": always the top k
+"""
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+ROTATIONS = ("rotate", "shuffle", "none")
+
+
+class _Entry:
+    __slots__ = ("pools", "quotas", "stored_at", "compute_seconds", "served")
+
+    def __init__(self, pools, quotas, compute_seconds):
+        self.pools = pools
+        self.quotas = quotas
+        self.stored_at = time.monotonic()
+        self.compute_seconds = compute_seconds
+        self.served = 0
+
+
+class RecommendationCache:
+    """TTL + LRU cache of per-leaning candidate pools"""
+
+    def __init__(self, ttl_seconds=900, max_entries=5000, rotation="rotate", pool_factor=3):
+        if rotation not in ROTATIONS:
+            raise ValueError(f"Unknown rotation '{rotation}' (expected one of {', '.join(ROTATIONS)})")
+        self.ttl = float(ttl_seconds)
+        self.max_entries = max(1, int(max_entries))
+        self.rotation = rotation
+        self.pool_factor = max(1, int(pool_factor))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self.computed_seconds = 0.0
+        self.computed = 0
+
+    @staticmethod
+    def key(keywords, quotas):
+        terms = tuple(sorted({" ".join(k.lower().split()) for k in keywords if k and k.strip()}))
+        return (terms, tuple(sorted(quotas.items())))
+
+    def _select(self, entry):
+        selected = {}
+        for leaning, k in entry.quotas.items():
+            pool = entry.pools.get(leaning, [])
+            if len(pool) <= k or self.rotation == "none":
+                selected[leaning] = pool[:k]
+            elif self.rotation == "shuffle":
+                picks = sorted(random.sample(range(len(pool)), k))
+                selected[leaning] = [pool[i] for i in picks]
+            else:
+                start = (entry.served * k) % len(pool)
+                selected[leaning] = [pool[(start + i) % len(pool)] for i in range(k)]
+        entry.served += 1
+        return selected
+
+    def get(self, key):
+        """Return {leaning: [posts]} for key, or None on a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.monotonic() - entry.stored_at >= self.ttl:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.saved_seconds += entry.compute_seconds
+            self._entries.move_to_end(key)
+            return self._select(entry)
+
+    def put(self, key, posts, quotas, compute_seconds):
+        """
+        Store the candidate pools from ranked, classified posts and return
+        the first selection. Empty results are not cached.
+        """
+        pools = {
+            leaning: [p for p in posts if p["leaning"] == leaning][:k * self.pool_factor]
+            for leaning, k in quotas.items()
+        }
+        entry = _Entry(pools, dict(quotas), compute_seconds)
+        with self._lock:
+            self.computed += 1
+            self.computed_seconds += compute_seconds
+            if any(pools.values()):
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return self._select(entry)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "rotation": self.rotation,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "latency_saved_ms": round(self.saved_seconds * 1000, 1),
+            "avg_compute_ms": round(self.computed_seconds / self.computed * 1000, 1) if self.computed else 0.0,
+        }
+
+
+def recommendation_cache_from_env():
+    """Build a RecommendationCache configured from RECOMMEND_CACHE_* variables"""
+    return RecommendationCache(
+        ttl_seconds=float(os.getenv("RECOMMEND_CACHE_TTL", "900")),
+        max_entries=int(os.getenv("RECOMMEND_CACHE_SIZE", "5000")),
+        rotation=os.getenv("RECOMMEND_CACHE_ROTATION", "rotate"),
+        pool_factor=int(os.getenv("RECOMMEND_CACHE_POOL", "3")),
+    )
@@ -0,0 +1,302 @@
+"""
+Reddit access layer.
+
+Every Reddit call goes through a client with `search(query, limit, after,
+priority)`. There are two implementations:
+
+- RedditClient wraps praw with:
+  - a token bucket shared by all pre-forked workers (shared memory created
+    before the fork), refilled at REDDIT_REQUESTS_PER_MINUTE and capped by
+    the quota Reddit reports in its X-Ratelimit-* headers
+    (praw's `auth.limits`)
+  - "interactive" and "background" priorities; background calls leave
+    REDDIT_INTERACTIVE_RESERVE tokens for user-facing requests
+  - one pooled requests.Session per worker process
+- FakeRedditClient answers searches from a fixture file (the seeded CSV
+  by default), for offline load tests and benchmarks.
+
+REDDIT_BACKEND=praw|fake picks the implementation.
+"""
+import csv
+import hashlib
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+from candidate_index import tokenize
+
+class RedditRateLimited(Exception):
+    """Raised when no request token becomes available in time"""
+
+
+class TokenBucket:
+    """
+    Token bucket in shared memory, also bounded by Reddit's reported quota.
+
+    State: [tokens, last refill (time.time), remaining quota, quota reset time].
+    A remaining quota of -1 means Reddit has not reported one yet.
+    """
+
+    def __init__(self, requests_per_minute=100, burst=10, interactive_reserve=2):
+        self.rate = requests_per_minute / 60.0
+        self.capacity = float(burst)
+        self.reserve = float(interactive_reserve)
+        self._state = multiprocessing.RawArray("d", [self.capacity, time.time(), -1.0, 0.0])
+        self._lock = multiprocessing.Lock()
+        self._interactive_waiting = multiprocessing.RawValue("i", 0)
+
+        self.acquired = 0
+        self.waits = 0
+        self.total_wait = 0.0
+        self.rejected = 0
+
+    def _try_acquire(self, priority):
+        """Take a token, or return how long to wait before trying again"""
+        state = self._state
+        with self._lock:
+            now = time.time()
+            state[0] = min(self.capacity, state[0] + (now - state[1]) * self.rate)
+            state[1] = now
+
+            if state[2] >= 0 and now >= state[3]:
+                state[2] = -1.0  # quota window has reset
+            # Background calls leave the last few tokens (and quota) for users
+            floor = 1.0 if priority == "interactive" else 1.0 + self.reserve
+            if priority == "background" and self._interactive_waiting.value > 0:
+                return 0.05
+            if 0 <= state[2] < floor:
+                return max(0.05, state[3] - now)
+            if state[0] < floor:
+                return (floor - state[0]) / self.rate
+
+            state[0] -= 1
+            if state[2] >= 0:
+                state[2] -= 1
+            return 0.0
+
+    def acquire(self, priority="interactive", timeout=5.0):
+        """Block until a token is available; raise RedditRateLimited after timeout"""
+        start = time.monotonic()
+        waiting = False
+        try:
+            while True:
+                wait = self._try_acquire(priority)
+                if wait == 0:
+                    self.acquired += 1
+                    waited = time.monotonic() - start
+                    if waited > 0.001:
+                        self.waits += 1
+                        self.total_wait += waited
+                    return
+                if time.monotonic() - start + wait > timeout:
+                    self.rejected += 1
+                    raise RedditRateLimited(f"no Reddit request token within {timeout}s ({priority})")
+                if priority == "interactive" and not waiting:
+                    waiting = True
+                    with self._lock:
+                        self._interactive_waiting.value += 1
+                time.sleep(min(wait, 0.5))
+        finally:
+            if waiting:
+                with self._lock:
+                    self._interactive_waiting.value -= 1
+
+    def update_quota(self, remaining, reset_timestamp):
+        """Record the quota Reddit reported on the last response"""
+        if remaining is None or reset_timestamp is None:
+            return
+        with self._lock:
+            self._state[2] = float(remaining)
+            self._state[3] = float(reset_timestamp)
+
+    def stats(self):
+        state = list(self._state)
+        return {
+            "tokens": round(state[0], 2),
+            "reddit_remaining": state[2] if state[2] >= 0 else None,
+            "reddit_reset_in": round(max(0.0, state[3] - time.time()), 1) if state[2] >= 0 else None,
+            "acquired": self.acquired,
+            "waits": self.waits,
+            "avg_wait_ms": round(1000 * self.total_wait / self.waits, 2) if self.waits else 0.0,
+            "rejected": self.rejected,
+        }
+
+
+class RedditClient:
+    """praw search behind a shared token bucket and a pooled HTTP session"""
+
+    def __init__(self, client_id, client_secret, user_agent, bucket, pool_size=10, timeouts=None):
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.user_agent = user_agent
+        self.bucket = bucket
+        self.pool_size = pool_size
+        self.timeouts = timeouts or {"interactive": 5.0, "background": 30.0}
+        self._reddit = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def _client(self):
+        """praw.Reddit for this process (sessions must not cross a fork)"""
+        if self._reddit is not None and self._pid == os.getpid():
+            return self._reddit
+        with self._lock:
+            if self._reddit is None or self._pid != os.getpid():
+                import praw
+                import requests
+                from requests.adapters import HTTPAdapter
+
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=2, pool_maxsize=self.pool_size)
+                session.mount("https://", adapter)
+                self._reddit = praw.Reddit(
+                    client_id=self.client_id,
+                    client_secret=self.client_secret,
+                    user_agent=self.user_agent,
+                    requestor_kwargs={"session": session},
+                )
+                self._pid = os.getpid()
+        return self._reddit
+
+    def search(self, query, limit, after=None, priority="interactive"):
+        """Top posts on r/all for query (blocking; one request token per 100 results)"""
+        reddit = self._client()
+        for _ in range(max(1, (limit + 99) // 100)):
+            self.bucket.acquire(priority, self.timeouts.get(priority, 5.0))
+        params = {"after": after} if after else {}
+        self.requests += 1
+        try:
+            return list(reddit.subreddit("all").search(query, sort="top", limit=limit, params=params))
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            limits = reddit.auth.limits
+            self.bucket.update_quota(limits.get("remaining"), limits.get("reset_timestamp"))
+
+    def stats(self):
+        return {"backend": "praw", "requests": self.requests, "errors": self.errors, **self.bucket.stats()}
+
+
+# --- FAKE CLIENT ---
+class _FakeSubreddit:
+    __slots__ = ("display_name",)
+
+    def __init__(self, display_name):
+        self.display_name = display_name
+
+
+class FakeSubmission:
+    """The Submission attributes the API reads"""
+
+    __slots__ = ("id", "fullname", "title", "selftext", "permalink", "score", "num_comments", "subreddit")
+
+    def __init__(self, index, title, selftext, permalink, subreddit, score, num_comments):
+        self.id = f"fake{index}"
+        self.fullname = f"t3_{self.id}"
+        self.title = title
+        self.selftext = selftext
+        self.permalink = permalink
+        self.subreddit = _FakeSubreddit(subreddit)
+        self.score = score
+        self.num_comments = num_comments
+
+
+def load_fixture(path):
+    """Fixture posts from a .json list or a CSV with title, permalink and body columns"""
+    if path.endswith(".json"):
+        with open(path) as f:
+            rows = json.load(f)
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            rows = list(csv.DictReader(f))
+
+    posts = []
+    for i, row in enumerate(rows):
+        permalink = row.get("permalink") or f"/r/fake/comments/{i}/"
+        parts = permalink.strip("/").split("/")
+        subreddit = row.get("subreddit") or (parts[1] if len(parts) > 1 and parts[0] == "r" else "fake")
+        # Stable pseudo-random engagement numbers when the fixture has none
+        seed = int(hashlib.md5(permalink.encode("utf-8")).hexdigest()[:8], 16)
+        posts.append(FakeSubmission(
+            i,
+            row.get("title") or "",
+            row.get("body") or row.get("selftext") or "",
+            permalink,
+            subreddit,
+            int(row.get("score") or seed % 5000),
+            int(row.get("num_comments") or seed % 700),
+        ))
+    return posts
+
+
+class FakeRedditClient:
+    """Search over fixture posts with optional simulated latency"""
+
+    def __init__(self, fixture_path, latency_ms=0.0):
+        self.posts = load_fixture(fixture_path)
+        self.latency = latency_ms / 1000.0
+        self._postings = {}
+        for i, post in enumerate(self.posts):
+            for term in set(tokenize(f"{post.title} {post.selftext}")):
+                self._postings.setdefault(term, []).append(i)
+        self._positions = {post.fullname: i for i, post in enumerate(self.posts)}
+        self.requests = 0
+        print(f"Fake Reddit client: {len(self.posts)} fixture posts from {fixture_path}")
+
+    def search(self, query, limit, after=None, priority="interactive"):
+        """Posts matching any query term, by matched terms then score; paged like Reddit"""
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        matches = {}
+        for term in set(tokenize(query)):
+            for i in self._postings.get(term, ()):
+                matches[i] = matches.get(i, 0) + 1
+        ranked = sorted(matches, key=lambda i: (-matches[i], -self.posts[i].score, i))
+
+        start = 0
+        if after is not None:
+            position = self._positions.get(after)
+            start = ranked.index(position) + 1 if position in matches else len(ranked)
+        return [self.posts[i] for i in ranked[start:start + limit]]
+
+    def stats(self):
+        return {"backend": "fake", "requests": self.requests, "fixture_posts": len(self.posts)}
+
+
+DEFAULT_FIXTURE = os.path.join(os.path.dirname(__file__), "..", "database", "data", "unlabelled_data_clean.csv")
+
+
+def reddit_client_from_env():
+    """Build the Reddit client selected by REDDIT_BACKEND"""
+    backend = os.getenv("REDDIT_BACKEND", "praw")
+    if backend == "fake":
+        return FakeRedditClient(
+            os.getenv("REDDIT_FIXTURE_PATH", DEFAULT_FIXTURE),
+            latency_ms=float(os.getenv("REDDIT_FAKE_LATENCY_MS", "0")),
+        )
+    if backend != "praw":
+        raise ValueError(f"Unknown REDDIT_BACKEND '{backend}' (expected praw or fake)")
+
+    bucket = TokenBucket(
+        requests_per_minute=float(os.getenv("REDDIT_REQUESTS_PER_MINUTE", "100")),
+        burst=float(os.getenv("REDDIT_BURST", "10")),
+        interactive_reserve=float(os.getenv("REDDIT_INTERACTIVE_RESERVE", "2")),
+    )
+    return RedditClient(
+        client_id=os.getenv("REDDIT_CLIENT_ID"),
+        client_secret=os.getenv("REDDIT_SECRET_ID"),
+        user_agent="counter_recommendation_system",
+        bucket=bucket,
+        pool_size=int(os.getenv("REDDIT_POOL_SIZE", "10")),
+        timeouts={
+            "interactive": float(os.getenv("REDDIT_MAX_WAIT", "5")),
+            "background": float(os.getenv("REDDIT_BACKGROUND_MAX_WAIT", "30")),
+        },
+    )
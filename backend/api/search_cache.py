@@ -0,0 +1,169 @@
+"""
+Cache of classified Reddit search results.
+
+Entries are keyed on the normalized query (plus the result limit) and hold
+the already classified post dicts returned by search_and_classify(), so a
+hit skips both the Reddit round trip and the model.
+
+- Fresh entries (younger than `ttl`) are returned directly.
+- Stale entries (younger than `ttl + stale_ttl`) are returned immediately
+  while one background task refreshes them.
+- Concurrent misses for the same key share a single upstream call.
+- Callers that update an entry outside get() (peek, then put) serialize on
+  locked(), so concurrent updates neither repeat a fetch nor lose results.
+"""
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+
+def normalize_query(query):
+    return " ".join((query or "").lower().split())
+
+
+class SearchCache:
+    """TTL cache with single-flight fetches and stale-while-revalidate"""
+
+    def __init__(self, ttl_seconds=600, stale_ttl_seconds=3600, max_entries=2000):
+        self.ttl = float(ttl_seconds)
+        self.stale_ttl = float(stale_ttl_seconds)
+        self.max_entries = max(1, int(max_entries))
+        self._entries = OrderedDict()  # key -> (fetched_at, results)
+        self._in_flight = {}           # key -> asyncio.Task running the fetch
+        self._background = set()
+        self._locks = {}               # key -> [asyncio.Lock, callers using it]
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.errors = 0
+
+    def _key(self, query, limit):
+        return (normalize_query(query), limit)
+
+    def _store(self, key, results):
+        self._entries[key] = (time.monotonic(), results)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def _fetch(self, key, fetch):
+        """
+        Run fetch once per key in its own task; every caller, the first one
+        included, awaits it through shield(), so a caller that is cancelled
+        (client disconnect, timeout) cancels neither the fetch nor the others
+        """
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.create_task(self._run_fetch(key, fetch))
+            # Retrieve the exception even if every caller has gone away
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._in_flight[key] = task
+        return await asyncio.shield(task)
+
+    async def _run_fetch(self, key, fetch):
+        try:
+            results = await fetch()
+            self._store(key, results)
+            return results
+        except Exception:
+            self.errors += 1
+            raise
+        finally:
+            del self._in_flight[key]
+
+    def _refresh_in_background(self, key, fetch):
+        if key in self._in_flight:
+            return
+        self.refreshes += 1
+
+        async def refresh():
+            try:
+                await self._fetch(key, fetch)
+            except Exception as e:
+                print(f"Background search refresh failed for '{key[0]}': {e}")
+
+        task = asyncio.create_task(refresh())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def get(self, query, limit, fetch, refresh=None):
+        """
+        Return results for query, calling `await fetch()` only when needed.
+
+        Stale entries are refreshed with `refresh` (default: fetch), e.g. a
+        lower-priority variant of the same call.
+        """
+        key = self._key(query, limit)
+        entry = self._entries.get(key)
+        if entry is not None:
+            age = time.monotonic() - entry[0]
+            if age < self.ttl:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return entry[1]
+            if age < self.ttl + self.stale_ttl:
+                self.stale_hits += 1
+                self._refresh_in_background(key, refresh or fetch)
+                return entry[1]
+
+        self.misses += 1
+        return await self._fetch(key, fetch)
+
+    def peek(self, query, limit):
+        """Return fresh cached results without fetching (None on a miss; not counted in stats)"""
+        key = self._key(query, limit)
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[0] >= self.ttl:
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    @asynccontextmanager
+    async def locked(self, query, limit, timeout=None):
+        """Hold the entry's lock for a peek/put update; raises asyncio.TimeoutError after timeout"""
+        key = self._key(query, limit)
+        holder = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        holder[1] += 1
+        try:
+            await asyncio.wait_for(holder[0].acquire(), timeout)
+            try:
+                yield
+            finally:
+                holder[0].release()
+        finally:
+            holder[1] -= 1
+            if not holder[1]:
+                del self._locks[key]
+
+    def put(self, query, limit, results):
+        """Store results fetched outside get(), e.g. by an incremental search"""
+        self._store(self._key(query, limit), results)
+
+    def stats(self):
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "background_refreshes": self.refreshes,
+            "errors": self.errors,
+            "hit_rate": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0,
+        }
+
+
+def search_cache_from_env():
+    """Build a SearchCache configured from SEARCH_CACHE_* variables"""
+    return SearchCache(
+        ttl_seconds=float(os.getenv("SEARCH_CACHE_TTL", "600")),
+        stale_ttl_seconds=float(os.getenv("SEARCH_CACHE_STALE_TTL", "3600")),
+        max_entries=int(os.getenv("SEARCH_CACHE_SIZE", "2000")),
+    )
@@ -0,0 +1,142 @@
+"""
+Pre-fork model server.
+
+The master process imports the API, loads the model bundle, KeyBERT and the
+tokenizer once, binds the listening socket and then forks N workers. The
+workers inherit the loaded weights copy-on-write (on top of the bundle's
+shared memory map), so scaling across cores does not multiply RAM per
+worker. Each worker gets its own torch.set_num_threads setting.
+
+With INFERENCE_BACKEND=onnx the master only loads the weights and writes
+the ONNX export; every worker opens its own ONNX Runtime session at
+startup, since a session's thread pools do not survive fork().
+
+    python serve.py --workers 4 --threads 2
+    API_WORKERS=4 TORCH_THREADS=2 python serve.py
+
+Dead workers are restarted; SIGINT/SIGTERM on the master stops all of them.
+"""
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+# Fork after the Rust tokenizer has been loaded is only safe without its thread pool
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+
+def parse_args():
+    cpus = os.cpu_count() or 1
+    workers = int(os.getenv("API_WORKERS", "1"))
+    parser = argparse.ArgumentParser(description="Run the API as pre-forked workers sharing one model")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=workers, help="Number of worker processes")
+    parser.add_argument("--threads", type=int, default=int(os.getenv("TORCH_THREADS", "0")),
+                        help="torch threads per worker (default: CPUs / workers)")
+    args = parser.parse_args()
+    args.workers = max(1, args.workers)
+    if args.threads <= 0:
+        args.threads = max(1, cpus // args.workers)
+    return args
+
+
+def bind_socket(host, port):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app_module, sock, threads):
+    """Child process: configure per-worker state and serve on the shared socket"""
+    import torch
+    import uvicorn
+
+    torch.set_num_threads(threads)
+    # Pooled DB connections must not be shared with the parent
+    app_module.database.dispose_after_fork()
+
+    config = uvicorn.Config(app_module.app, log_level="info")
+    server = uvicorn.Server(config)
+    print(f"[worker {os.getpid()}] serving with {threads} torch threads")
+    server.run(sockets=[sock])
+
+
+def spawn_worker(app_module, sock, threads):
+    pid = os.fork()
+    if pid == 0:
+        # Restore default signal handling so uvicorn can install its own
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        try:
+            run_worker(app_module, sock, threads)
+        finally:
+            os._exit(0)
+    return pid
+
+
+def main():
+    args = parse_args()
+    print(f"[master {os.getpid()}] loading model, tokenizer and KeyBERT once...")
+
+    import combined_api
+    combined_api.preload_model()
+
+    sock = bind_socket(args.host, args.port)
+    print(f"[master] listening on {args.host}:{args.port}, forking {args.workers} workers x {args.threads} threads")
+
+    # Move everything allocated so far out of the GC's reach so collections in
+    # the workers do not write to (and un-share) the inherited pages
+    gc.collect()
+    gc.freeze()
+
+    workers = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for _ in range(args.workers):
+        pid = spawn_worker(combined_api, sock, args.threads)
+        workers[pid] = time.monotonic()
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        started = workers.pop(pid, None)
+        if started is None or stopping:
+            continue
+
+        print(f"[master] worker {pid} exited with status {status}, restarting")
+        # Avoid a tight restart loop if workers die right after starting
+        if time.monotonic() - started < 1:
+            time.sleep(1)
+        new_pid = spawn_worker(combined_api, sock, args.threads)
+        workers[new_pid] = time.monotonic()
+
+    sock.close()
+    print("[master] all workers stopped")
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The API modules are flat files in backend/api
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
@@ -0,0 +1,177 @@
+import json
+import multiprocessing
+import time
+
+import pytest
+from sqlalchemy import Boolean, Column, DateTime, Integer, MetaData, String, Table, Text, create_engine, func, select
+
+from activity_writer import ActivityWriter
+
+
+def make_table():
+    metadata = MetaData()
+    table = Table(
+        "user_activity",
+        metadata,
+        Column("id", Integer, primary_key=True, autoincrement=True),
+        Column("user_id", String(255)),
+        Column("title", String(255)),
+        Column("body", Text),
+        Column("bias_label", String(50)),
+        Column("subreddit", String(255)),
+        Column("threshold_reached", Boolean, default=False),
+        Column("recommendation_triggered", Boolean, default=False),
+        Column("recommended_post_urls", Text),
+        Column("timestamp", DateTime),
+    )
+    return metadata, table
+
+
+def activity(user_id, title):
+    return dict(
+        user_id=user_id,
+        title=title,
+        body="",
+        bias_label="left",
+        subreddit="politics",
+        threshold_reached=False,
+        recommendation_triggered=False,
+        recommended_post_urls=json.dumps([]),
+    )
+
+
+RECOMMENDED = dict(threshold_reached=True, recommendation_triggered=True, recommended_post_urls='["u"]')
+
+
+@pytest.fixture
+def setup(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'activity.db'}")
+    metadata, table = make_table()
+    writer = ActivityWriter(engine, table, spill_path=str(tmp_path / "spill.jsonl"))
+    return engine, metadata, table, writer
+
+
+def rows(engine, table):
+    with engine.connect() as conn:
+        return {r.user_id: r for r in conn.execute(select(table)).all()}
+
+
+def test_flush_writes_inserts_and_updates(setup):
+    engine, metadata, table, writer = setup
+    metadata.create_all(engine)
+
+    buffered = writer.add(activity("a", "t1"))
+    written = writer.add(activity("b", "t2"))
+    other = writer.add(activity("c", "t3"))
+    writer.update(buffered, RECOMMENDED)  # merged before the insert
+    assert writer.flush()
+
+    writer.update(written, RECOMMENDED)
+    writer.update_latest("c", "t3", RECOMMENDED)
+    writer.add(activity("d", "t4"))
+    assert writer.flush()
+
+    result = rows(engine, table)
+    assert set(result) == {"a", "b", "c", "d"}
+    assert all(result[u].recommendation_triggered for u in "abc")
+    assert not result["d"].recommendation_triggered
+    assert writer.stats()["spilled"] == 0 and other.written
+
+
+def test_failed_flush_spills_and_replays_in_order(setup):
+    engine, metadata, table, writer = setup
+
+    first = writer.add(activity("a", "t1"))
+    writer.add(activity("b", "t2"))
+    assert not writer.flush()  # no table yet
+    assert first.spilled
+
+    # Updates for spilled rows must not run before the rows are replayed
+    writer.update(first, RECOMMENDED)
+    writer.update_latest("b", "t2", RECOMMENDED)
+    writer.add(activity("c", "t3"))
+
+    metadata.create_all(engine)
+    assert writer.flush()
+
+    result = rows(engine, table)
+    assert set(result) == {"a", "b", "c"}
+    assert result["a"].recommendation_triggered
+    assert result["b"].recommendation_triggered
+    assert not writer._has_spill()
+
+
+def test_update_queued_during_a_failed_insert_is_spilled_behind_it(setup, monkeypatch):
+    engine, metadata, table, writer = setup
+    metadata.create_all(engine)
+    handle = writer.add(activity("a", "t1"))
+
+    def failing_insert(conn, rows):
+        # The request for /api/recommend arrives while the batch is in flight
+        writer.update(handle, RECOMMENDED)
+        raise RuntimeError("database unavailable")
+
+    monkeypatch.setattr(writer, "_insert", failing_insert)
+    assert not writer.flush()
+    monkeypatch.undo()
+
+    assert writer.flush()
+    assert rows(engine, table)["a"].recommendation_triggered
+
+
+def write_spill(path, user_ids):
+    with open(path, "w") as f:
+        for user_id in user_ids:
+            f.write(json.dumps({"op": "insert", "row": activity(user_id, "t")}) + "\n")
+
+
+def test_spill_of_exited_process_is_adopted_once(setup, tmp_path):
+    engine, metadata, table, writer = setup
+    metadata.create_all(engine)
+    write_spill(f"{writer.spill_path}.999999999", ["gone"])  # no such pid
+
+    assert writer.replay_spill()
+    assert writer.replay_spill()
+    assert list(rows(engine, table)) == ["gone"]
+
+
+def test_concurrent_workers_do_not_replay_a_spill_twice(setup):
+    engine, metadata, table, writer = setup
+    metadata.create_all(engine)
+    write_spill(writer.spill_path, [f"u{i}" for i in range(200)])
+    ctx = multiprocessing.get_context("fork")
+    barrier = ctx.Barrier(4)
+
+    def replay():
+        engine.dispose(close=False)
+        barrier.wait()
+        ActivityWriter(engine, table, spill_path=writer.spill_path).replay_spill()
+
+    workers = [ctx.Process(target=replay) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(30)
+        assert worker.exitcode == 0
+
+    assert len(rows(engine, table)) == 200
+
+
+def test_timestamps_use_the_same_clock_as_current_timestamp(setup, monkeypatch):
+    engine, metadata, table, writer = setup
+    metadata.create_all(engine)
+    # An API server whose local time is not UTC
+    monkeypatch.setenv("TZ", "Asia/Singapore")
+    time.tzset()
+    try:
+        writer.add(activity("a", "t"))
+    finally:
+        monkeypatch.undo()
+        time.tzset()
+    writer.flush()
+
+    with engine.connect() as conn:
+        stored = conn.execute(select(table.c.timestamp)).scalar()
+        now = conn.execute(select(func.current_timestamp())).scalar()
+    # SQLite's CURRENT_TIMESTAMP is UTC, as MySQL's is in the writer's sessions
+    assert abs((now - stored).total_seconds()) < 5
@@ -0,0 +1,67 @@
+import threading
+
+from batching import MicroBatcher
+
+
+def test_background_predict_runs_in_max_batch_size_chunks():
+    sizes = []
+
+    def predict(texts, max_length):
+        sizes.append(len(texts))
+        return list(texts)
+
+    batcher = MicroBatcher(predict, max_batch_size=8, max_wait_ms=0)
+    try:
+        texts = [str(i) for i in range(20)]
+        assert batcher.predict(texts, 256, priority="background") == texts
+    finally:
+        batcher.stop()
+    assert sizes == [8, 8, 4]
+
+
+def test_interactive_requests_run_before_queued_background_work():
+    started, release = threading.Event(), threading.Event()
+    order = []
+
+    def predict(texts, max_length):
+        if texts == ["first"]:
+            started.set()
+            release.wait(5)
+        order.append(texts[0])
+        return list(texts)
+
+    batcher = MicroBatcher(predict, max_batch_size=8, max_wait_ms=0)
+    try:
+        first = batcher.submit(["first"], 256)
+        started.wait(5)  # the batcher thread is busy, so the rest queues up
+        background = [batcher.submit([f"bg{i}"], 256, priority="background") for i in range(2)]
+        interactive = batcher.submit(["interactive"], 256)
+        release.set()
+        for future in [first, interactive, *background]:
+            future.result(timeout=5)
+    finally:
+        batcher.stop()
+    assert order == ["first", "interactive", "bg0", "bg1"]
+
+
+def test_load_counts_queued_and_running_texts():
+    started, release = threading.Event(), threading.Event()
+
+    def predict(texts, max_length):
+        started.set()
+        release.wait(5)
+        return list(texts)
+
+    batcher = MicroBatcher(predict, max_batch_size=8, max_wait_ms=0)
+    try:
+        running = batcher.submit(["a", "b"], 256)
+        started.wait(5)
+        queued = batcher.submit(["c"], 256)
+        background = batcher.submit(["d"], 256, priority="background")
+        assert batcher.load() == 3  # background work does not count
+        release.set()
+        for future in (running, queued, background):
+            future.result(timeout=5)
+        assert batcher.load() == 0
+    finally:
+        batcher.stop()
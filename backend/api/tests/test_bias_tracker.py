@@ -0,0 +1,74 @@
+import asyncio
+import time
+
+from sqlalchemy import create_engine
+
+from bias_tracker import BiasTracker, SQLBiasStore
+
+
+def shared_store(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'bias.db'}", connect_args={"check_same_thread": False})
+    store = SQLBiasStore(engine)
+    store.create_table()
+    return store
+
+
+def test_memory_tracker_resets_at_threshold():
+    tracker = BiasTracker(threshold=3)
+    results = [asyncio.run(tracker.increment_and_check("u", "left")) for _ in range(4)]
+    assert [r[0] for r in results] == [None, None, "left", None]
+    assert results[-1][1] == 1
+
+
+def test_two_workers_trigger_a_crossing_once(tmp_path):
+    store = shared_store(tmp_path)
+    a = BiasTracker(threshold=3, store=store)
+    b = BiasTracker(threshold=3, store=store)
+
+    async def scenario():
+        await a.increment_and_check("u", "left")
+        await a.increment_and_check("u", "left")
+        a.flush()                                           # stored total 2
+        first = await b.increment_and_check("u", "left")   # loads 2, reaches 3
+        second = await a.increment_and_check("u", "left")  # stale local view of 3
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first[0] == "left"
+    assert second[0] is None
+    assert a.claims_lost == 1 and b.claims_lost == 0
+    assert store.load(["u"]) == {"u": (1, 0)}
+
+
+def test_claim_keeps_other_workers_increments(tmp_path):
+    store = shared_store(tmp_path)
+    a = BiasTracker(threshold=2, store=store)
+    b = BiasTracker(threshold=2, store=store)
+
+    async def scenario():
+        await a.increment_and_check("u", "right")
+        await b.increment_and_check("u", "left")
+        b.flush()
+        return await a.increment_and_check("u", "right")
+
+    bias, left, right = asyncio.run(scenario())
+    assert (bias, left, right) == ("right", 1, 2)
+    # The reset happens under the row lock, so nothing is lost or double counted
+    assert store.load(["u"]) == {"u": (0, 0)}
+    b.flush()
+    assert store.load(["u"]) == {"u": (0, 0)}
+
+
+def test_memory_tracker_evicts_idle_users_in_the_background():
+    tracker = BiasTracker(threshold=3, idle_seconds=0.05, flush_interval=0.01)
+    tracker.start()
+    try:
+        asyncio.run(tracker.increment_and_check("u", "left"))
+        assert tracker.stats()["users"] == 1
+        for _ in range(100):
+            if tracker.evicted:
+                break
+            time.sleep(0.01)
+    finally:
+        tracker.stop()
+    assert tracker.stats()["users"] == 0 and tracker.evicted == 1
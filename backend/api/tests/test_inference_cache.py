@@ -0,0 +1,47 @@
+import asyncio
+import sqlite3
+import threading
+import time
+
+from inference_cache import ClassificationCache
+
+
+def disk_rows(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM classification_cache").fetchone()[0]
+
+
+def test_expired_disk_entries_are_purged_on_write(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ClassificationCache("v1", ttl_seconds=0.05, disk_path=path, disk_purge_every=2)
+    cache.put_many({"old": [1.0, 0.0, 0.0]})
+    cache.flush()
+    time.sleep(0.1)
+    assert disk_rows(path) == 1
+
+    cache.put_many({"new": [0.0, 1.0, 0.0]})  # second write triggers the purge
+    cache.flush()
+    assert disk_rows(path) == 1
+    assert cache.stats()["disk_purged"] == 1
+    assert cache.get_many(["new"]) == {"new": [0.0, 1.0, 0.0]}
+
+
+def test_async_lookup_reads_the_disk_tier_off_the_event_loop(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.db")
+    writer = ClassificationCache("v1", disk_path=path)
+    writer.put_many({"k": [0.2, 0.3, 0.5]})
+    writer.flush()
+
+    reader = ClassificationCache("v1", disk_path=path)  # another worker: empty memory tier
+    loop_thread = threading.get_ident()
+    read_threads = []
+    disk_get_many = reader._disk.get_many
+
+    def tracked(keys):
+        read_threads.append(threading.get_ident())
+        return disk_get_many(keys)
+
+    monkeypatch.setattr(reader._disk, "get_many", tracked)
+    assert asyncio.run(reader.get_many_async(["k", "missing"])) == {"k": [0.2, 0.3, 0.5]}
+    assert read_threads and loop_thread not in read_threads
+    assert reader.stats()["disk_hits"] == 1 and reader.stats()["misses"] == 1
@@ -0,0 +1,78 @@
+import asyncio
+import threading
+import time
+
+from batching import MicroBatcher
+from inference_executor import InferenceExecutor, InferenceQueueFull
+
+
+def slow_predict(texts, max_length):
+    time.sleep(0.02)
+    return [len(t) for t in texts]
+
+
+def test_batched_requests_are_not_limited_to_slots():
+    batcher = MicroBatcher(slow_predict, max_batch_size=32, max_wait_ms=20)
+    executor = InferenceExecutor(slots=4, max_queue=0, max_batched=256)
+
+    async def main():
+        return await asyncio.gather(*(
+            executor.run_batched(batcher.submit, [f"text {i}"], 256) for i in range(128)
+        ))
+
+    try:
+        results = asyncio.run(main())
+    finally:
+        batcher.stop()
+    assert [r[0] for r in results] == [len(f"text {i}") for i in range(128)]
+    assert batcher.stats()["avg_batch_size"] > executor.slots
+
+
+def test_run_batched_rejects_past_max_batched():
+    batcher = MicroBatcher(slow_predict, max_batch_size=32, max_wait_ms=20)
+    executor = InferenceExecutor(slots=1, max_queue=0, max_batched=2)
+
+    async def main():
+        return await asyncio.gather(
+            *(executor.run_batched(batcher.submit, ["x"], 256) for _ in range(3)),
+            return_exceptions=True,
+        )
+
+    try:
+        results = asyncio.run(main())
+    finally:
+        batcher.stop()
+    assert sum(isinstance(r, InferenceQueueFull) for r in results) == 1
+    assert executor.stats()["batched_waiting"] == 0
+
+
+def test_cancelled_caller_does_not_break_its_batch():
+    started, release = threading.Event(), threading.Event()
+
+    def predict(texts, max_length):
+        if texts == ["block"]:
+            started.set()
+            release.wait(5)
+        return [len(t) for t in texts]
+
+    batcher = MicroBatcher(predict, max_batch_size=32, max_wait_ms=0)
+    executor = InferenceExecutor(slots=1, max_queue=0, max_batched=8)
+
+    async def main():
+        blocker = asyncio.ensure_future(executor.run_batched(batcher.submit, ["block"], 256))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait, 5)
+        # Both queue behind the blocked batch and are taken together
+        cancelled = asyncio.ensure_future(executor.run_batched(batcher.submit, ["gone"], 256))
+        kept = asyncio.ensure_future(executor.run_batched(batcher.submit, ["kept"], 256))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        await asyncio.sleep(0.01)  # let the cancellation reach the batcher's future
+        release.set()
+        later = await asyncio.wait_for(executor.run_batched(batcher.submit, ["later"], 256), 5)
+        return await blocker, await asyncio.wait_for(kept, 5), later
+
+    try:
+        assert asyncio.run(main()) == ([5], [4], [5])
+        assert batcher._thread.is_alive()
+    finally:
+        batcher.stop()
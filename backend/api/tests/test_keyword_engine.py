@@ -0,0 +1,41 @@
+import multiprocessing
+import os
+
+from keyword_engine import CorpusStats
+
+
+def save_repeatedly(path, n_docs, barrier, errors):
+    stats = CorpusStats.build(["tax cuts", "tax cuts", "budget vote"] * n_docs)
+    barrier.wait()
+    try:
+        for _ in range(50):
+            stats.save(path)
+    except Exception as e:
+        errors.put(repr(e))
+
+
+def test_save_and_load_round_trip(tmp_path):
+    path = str(tmp_path / "stats.npz")
+    stats = CorpusStats.build(["tax cuts", "tax cuts", "budget vote"])
+    stats.save(path)
+
+    loaded = CorpusStats.load(path)
+    assert loaded.n_docs == 3 and len(loaded) == len(stats)
+    assert loaded.lookup(["tax cuts"])[0] == stats.lookup(["tax cuts"])[0]
+    assert os.listdir(tmp_path) == ["stats.npz"]
+
+
+def test_workers_saving_at_once_do_not_clobber_each_other(tmp_path):
+    path = str(tmp_path / "stats.npz")
+    ctx = multiprocessing.get_context("fork")
+    barrier = ctx.Barrier(4)
+    errors = ctx.Queue()
+    procs = [ctx.Process(target=save_repeatedly, args=(path, n, barrier, errors)) for n in range(1, 5)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+
+    assert errors.empty()
+    assert CorpusStats.load(path).n_docs in (3, 6, 9, 12)
+    assert os.listdir(tmp_path) == ["stats.npz"]
@@ -0,0 +1,77 @@
+import asyncio
+
+from search_cache import SearchCache
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = SearchCache()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return ["post"]
+
+    async def main():
+        return await asyncio.gather(*(cache.get("Same  query", 10, fetch) for _ in range(5)))
+
+    assert asyncio.run(main()) == [["post"]] * 5
+    assert len(calls) == 1 and cache.stats()["coalesced"] == 4
+
+
+def test_cancelled_leader_does_not_cancel_waiters():
+    cache = SearchCache()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return ["post"]
+
+    async def main():
+        leader = asyncio.create_task(cache.get("q", 10, fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get("q", 10, fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        result = await waiter
+        return leader.cancelled(), result
+
+    assert asyncio.run(main()) == (True, ["post"])
+    assert cache.peek("q", 10) == ["post"]  # the fetch finished and was cached
+
+
+def test_failed_fetch_reaches_every_caller():
+    cache = SearchCache()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("reddit down")
+
+    async def main():
+        return await asyncio.gather(*(cache.get("q", 10, fetch) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert cache.stats()["errors"] == 1 and cache.stats()["entries"] == 0
+
+
+def test_locked_updates_of_one_entry_take_turns():
+    cache = SearchCache()
+    fetched = []
+
+    async def add_page(n):
+        async with cache.locked("q", "pages"):
+            state = cache.peek("q", "pages") or {"posts": []}
+            if len(state["posts"]) >= 2:
+                return  # already filled by the request before us
+            await asyncio.sleep(0.01)  # the upstream call
+            fetched.append(n)
+            cache.put("q", "pages", {"posts": state["posts"] + [n, n]})
+
+    async def main():
+        await asyncio.gather(*(add_page(n) for n in range(3)))
+
+    asyncio.run(main())
+    assert fetched == [0]
+    assert cache.peek("q", "pages") == {"posts": [0, 0]}
+    stats = cache.stats()
+    assert stats["hits"] == stats["misses"] == 0 and not cache._locks
@@ -0,0 +1,83 @@
+import multiprocessing
+import os
+
+import numpy as np
+from sqlalchemy import create_engine, text
+
+from candidate_index import refresh_from_db
+from vector_index import VectorIndex
+
+
+def doc(url, leaning="left", title="post"):
+    return {"title": title, "leaning": leaning, "url": url}
+
+
+def test_reopen_keeps_rows_and_offsets(tmp_path):
+    index = VectorIndex(path=str(tmp_path), model_name="model-a")
+    index.add(np.array([[1.0, 0.0]]), [doc("u1")])
+    index.offsets["redditposts"] = 1
+    index.save_offsets()
+
+    reopened = VectorIndex(path=str(tmp_path), model_name="model-a")
+    assert reopened.count("left") == 1
+    assert reopened.offsets == {"redditposts": 1}
+
+
+def test_model_change_rebuilds_from_scratch(tmp_path):
+    old = VectorIndex(path=str(tmp_path), model_name="model-a")
+    old.add(np.array([[1.0, 0.0]]), [doc("old", title="stale")])
+    old.offsets["redditposts"] = 5
+    old.save_offsets()
+    old.close()
+
+    rebuilt = VectorIndex(path=str(tmp_path), model_name="model-b")
+    assert len(rebuilt) == 0 and rebuilt.offsets == {}
+    rebuilt.add(np.array([[0.0, 1.0]]), [doc("new", title="fresh")])
+    rebuilt.close()
+
+    reopened = VectorIndex(path=str(tmp_path), model_name="model-b")
+    hits = reopened.search(np.array([0.0, 1.0]), "left", k=5)
+    assert [h["url"] for h in hits] == ["new"]
+
+
+def test_refresh_persists_advanced_offsets(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'posts.db'}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE redditposts (id INTEGER PRIMARY KEY, title TEXT, permalink TEXT, body TEXT)"))
+        for i in range(3):
+            conn.execute(
+                text("INSERT INTO redditposts (title, permalink, body) VALUES (:t, :p, '')"),
+                {"t": f"post {i}", "p": f"/r/politics/comments/{i}/"},
+            )
+
+    path = str(tmp_path / "index")
+    index = VectorIndex(path=path, embed_fn=lambda texts: np.ones((len(texts), 2)), model_name="m")
+    assert refresh_from_db(index, engine, lambda texts: ["left"] * len(texts), tables=("redditposts",)) == 3
+
+    reopened = VectorIndex(path=path, model_name="m")
+    assert reopened.offsets == {"redditposts": 3}
+    assert reopened.count("left") == 3
+
+
+def test_only_one_process_writes_and_the_others_reload(tmp_path):
+    path = str(tmp_path / "index")
+    writer = VectorIndex(path=path, model_name="m")
+    writer.add(np.array([[1.0, 0.0]]), [doc("u1")])
+    ctx = multiprocessing.get_context("fork")
+    ready, appended, result = ctx.Event(), ctx.Event(), ctx.Queue()
+
+    def worker():
+        reader = VectorIndex(path=path, model_name="m")
+        ready.set()
+        appended.wait(10)
+        result.put((reader.acquire_writer(), reader.reload(), reader.count("left"), reader.count("right")))
+
+    child = ctx.Process(target=worker)
+    child.start()
+    ready.wait(10)
+    writer.add(np.array([[0.0, 1.0], [1.0, 1.0]]), [doc("u2", "right"), doc("u3")])
+    appended.set()
+    child.join(10)
+
+    assert result.get(timeout=5) == (False, 2, 2, 1)
+    assert os.path.getsize(os.path.join(path, "left.f32")) == 2 * 2 * 4
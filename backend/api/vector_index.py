@@ -0,0 +1,361 @@
+"""
+Embedding index of pre-classified candidate posts, partitioned by leaning.
+
+Each leaning ("left", "neutral", "right") has its own partition, so picking
+"2 neutral + 2 opposite" posts is two top-k lookups on normalized
+embeddings (cosine similarity). Search is NumPy brute force by default;
+VECTOR_INDEX_ANN=hnsw adds an hnswlib graph per partition for large indexes.
+
+On disk every partition is an append-only pair of files, and vectors are
+memory-mapped at load time, so the index is ready as soon as it is opened:
+
+    vector_index/
+    ├── meta.json        # dim, embedding model, row counts, source offsets
+    ├── left.f32         # float32[count, dim], row-major
+    ├── left.jsonl       # one post dict per row
+    └── ...
+
+meta.json is written last, and readers never look past its counts. Only
+the process holding an flock on `.writer.lock` appends (pre-forked workers
+share the directory). It takes the lock before its first add(), truncates
+rows past the counts left by an interrupted write, and deletes an index
+built with another embedding model. The other processes pick up its rows
+with reload().
+"""
+import fcntl
+import json
+import os
+import threading
+
+import numpy as np
+
+LEANINGS = ("left", "neutral", "right")
+META_FILE = "meta.json"
+LOCK_FILE = ".writer.lock"
+DOC_FIELDS = ("title", "leaning", "url", "upvotes", "comments", "subreddit")
+
+
+def normalize_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        vectors = vectors[None, :]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+class _Partition:
+    """Vectors and post dicts for one leaning"""
+
+    def __init__(self, dim):
+        self.dim = dim
+        self.chunks = []  # memmap of the file on disk, then arrays added since
+        self.docs = []
+        self.ann = None
+
+    def __len__(self):
+        return len(self.docs)
+
+    def search(self, query, k):
+        """Return [(score, row)] for the top k rows by inner product"""
+        scores = np.concatenate([chunk @ query for chunk in self.chunks]) if self.chunks else np.empty(0)
+        if len(scores) == 0:
+            return []
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return sorted(((float(scores[i]), int(i)) for i in top), reverse=True)
+
+
+class VectorIndex:
+    """Leaning-partitioned nearest-neighbour index with incremental adds"""
+
+    def __init__(self, path=None, embed_fn=None, model_name="", ann=None, ann_min_size=20000):
+        self.path = path
+        self.embed_fn = embed_fn  # list of texts -> float array [n, dim]
+        self.model_name = model_name
+        self.ann = ann
+        self.ann_min_size = ann_min_size
+        self.dim = None
+        self.partitions = {}
+        self._urls = set()
+        self._doc_bytes = {}
+        self._lock = threading.Lock()
+        self.offsets = {}  # table -> last id read by refresh_from_db()
+        self.ready = False
+        self.searches = 0
+        self.reloads = 0
+        self._writer_pid = None
+        self._lock_file = None
+
+        if ann not in (None, "", "none", "hnsw"):
+            raise ValueError(f"Unknown VECTOR_INDEX_ANN '{ann}' (expected none or hnsw)")
+        if path and os.path.exists(os.path.join(path, META_FILE)):
+            self._open()
+
+    def __len__(self):
+        return sum(len(p) for p in self.partitions.values())
+
+    def count(self, leaning):
+        partition = self.partitions.get(leaning)
+        return len(partition) if partition else 0
+
+    # --- PERSISTENCE ---
+    def _file(self, leaning, ext):
+        return os.path.join(self.path, f"{leaning}.{ext}")
+
+    def _read_meta(self):
+        """meta.json, or None if it is missing or was built with another model"""
+        try:
+            with open(os.path.join(self.path, META_FILE)) as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return None
+        return meta if meta.get("model") == self.model_name else None
+
+    def _reset(self):
+        self.dim = None
+        self.partitions = {}
+        self._urls = set()
+        self._doc_bytes = {}
+        self.offsets = {}
+
+    def _load(self, meta):
+        """Map the rows meta.json counts past what is already loaded (caller holds self._lock)"""
+        rebuilt = self.dim is not None and meta["dim"] != self.dim
+        if rebuilt or any(meta["counts"].get(leaning, 0) < len(p) for leaning, p in self.partitions.items()):
+            self._reset()  # the writer started over
+        self.dim = meta["dim"]
+        self.offsets = dict(meta.get("offsets", {}))
+        added = 0
+        for leaning, count in meta["counts"].items():
+            partition = self.partitions.setdefault(leaning, _Partition(self.dim))
+            start = len(partition)
+            if count <= start:
+                continue
+            start_bytes, end_bytes = self._doc_bytes.get(leaning, 0), meta["doc_bytes"][leaning]
+            with open(self._file(leaning, "jsonl"), "rb") as f:
+                f.seek(start_bytes)
+                docs = [json.loads(line) for line in f.read(end_bytes - start_bytes).splitlines()]
+            block = np.memmap(self._file(leaning, "f32"), dtype=np.float32, mode="r",
+                              offset=start * self.dim * 4, shape=(count - start, self.dim))
+            partition.docs.extend(docs)
+            partition.chunks.append(block)
+            if partition.ann is not None:
+                partition.ann.resize_index(len(partition))
+                partition.ann.add_items(block, np.arange(start, len(partition)))
+            self._doc_bytes[leaning] = end_bytes
+            self._urls.update(doc["url"] for doc in docs)
+            added += count - start
+        self.ready = len(self) > 0
+        return added
+
+    def _open(self):
+        meta = self._read_meta()
+        if meta is None:
+            print(f"Vector index at {self.path} was built with another model, waiting for a rebuild")
+            return
+        with self._lock:
+            self._load(meta)
+        print(f"Vector index loaded from {self.path} ({len(self)} posts)")
+
+    def reload(self):
+        """Load rows the writing process appended since the last call; returns how many"""
+        if not self.path or self._writer_pid == os.getpid():
+            return 0
+        meta = self._read_meta()
+        if meta is None:
+            return 0
+        with self._lock:
+            added = self._load(meta)
+        self.reloads += 1
+        return added
+
+    def acquire_writer(self):
+        """
+        Become the one process that appends to the files; False while another
+        process holds the lock (it is released when that process exits)
+        """
+        if not self.path or self._writer_pid == os.getpid():
+            return True
+        os.makedirs(self.path, exist_ok=True)
+        # A new descriptor per process: a lock inherited across fork() would be shared
+        lock_file = open(os.path.join(self.path, LOCK_FILE), "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+
+        with self._lock:
+            self._lock_file = lock_file
+            self._writer_pid = os.getpid()
+            meta = self._read_meta()
+            if meta is None:
+                # Built with another model (or never built): start from scratch
+                self._delete_files()
+                self._reset()
+                self.ready = False
+            else:
+                self._load(meta)
+                # Drop rows an interrupted writer appended after its last meta.json
+                for leaning in LEANINGS:
+                    partition = self.partitions.get(leaning)
+                    for ext, size in (("f32", len(partition) * self.dim * 4 if partition else 0),
+                                      ("jsonl", self._doc_bytes.get(leaning, 0))):
+                        file_path = self._file(leaning, ext)
+                        if os.path.exists(file_path) and os.path.getsize(file_path) > size:
+                            with open(file_path, "r+b") as f:
+                                f.truncate(size)
+        print(f"[{os.getpid()}] writing the vector index at {self.path}")
+        return True
+
+    def close(self):
+        """Give up the writer lock (it is also released when the process exits)"""
+        if self._lock_file is not None and self._writer_pid == os.getpid():
+            self._lock_file.close()
+        self._lock_file = None
+        self._writer_pid = None
+
+    def _delete_files(self):
+        """Remove meta.json first, then the partition files it describes"""
+        for name in [META_FILE] + [f"{leaning}.{ext}" for leaning in LEANINGS for ext in ("f32", "jsonl")]:
+            file_path = os.path.join(self.path, name)
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+    def _write_meta(self):
+        meta = {
+            "dim": self.dim,
+            "model": self.model_name,
+            "counts": {leaning: len(p) for leaning, p in self.partitions.items()},
+            "doc_bytes": self._doc_bytes,
+            "offsets": self.offsets,
+        }
+        tmp_path = os.path.join(self.path, META_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.path, META_FILE))
+
+    def _append_to_disk(self, leaning, vectors, docs):
+        with open(self._file(leaning, "f32"), "ab") as f:
+            f.write(vectors.tobytes())
+        data = b"".join(json.dumps(doc).encode("utf-8") + b"\n" for doc in docs)
+        with open(self._file(leaning, "jsonl"), "ab") as f:
+            f.write(data)
+        self._doc_bytes[leaning] = self._doc_bytes.get(leaning, 0) + len(data)
+
+    # --- ADDING ---
+    def add(self, vectors, docs):
+        """Add posts with precomputed embeddings; returns how many were new"""
+        if not self.acquire_writer():
+            raise RuntimeError(f"Another process is writing the vector index at {self.path}")
+        vectors = normalize_rows(vectors)
+        with self._lock:
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+                if self.path:
+                    os.makedirs(self.path, exist_ok=True)
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dimensional vectors, got {vectors.shape[1]}")
+
+            by_leaning = {}
+            for vector, doc in zip(vectors, docs):
+                if not doc.get("url") or doc["url"] in self._urls or doc.get("leaning") not in LEANINGS:
+                    continue
+                self._urls.add(doc["url"])
+                rows, kept = by_leaning.setdefault(doc["leaning"], ([], []))
+                rows.append(vector)
+                kept.append({field: doc.get(field, "") for field in DOC_FIELDS})
+
+            added = 0
+            for leaning, (rows, kept) in by_leaning.items():
+                block = np.stack(rows).astype(np.float32)
+                partition = self.partitions.setdefault(leaning, _Partition(self.dim))
+                if self.path:
+                    self._append_to_disk(leaning, block, kept)
+                start = len(partition)
+                # docs first, so concurrent searches never see a row without its doc
+                partition.docs.extend(kept)
+                partition.chunks.append(block)
+                if partition.ann is not None:
+                    partition.ann.resize_index(len(partition))
+                    partition.ann.add_items(block, np.arange(start, len(partition)))
+                added += len(kept)
+
+            if self.path and added:
+                self._write_meta()
+        return added
+
+    def add_documents(self, docs):
+        """Embed and add classified post dicts (same interface as BM25Index)"""
+        docs = [doc for doc in docs if doc.get("url") and doc["url"] not in self._urls]
+        if not docs:
+            return 0
+        vectors = self.embed_fn([f"{doc.get('title', '')} {doc.get('body', '')}".strip() for doc in docs])
+        return self.add(vectors, docs)
+
+    def save_offsets(self):
+        """Persist self.offsets once refresh_from_db() has advanced them"""
+        if not self.path:
+            return
+        if not self.acquire_writer():
+            raise RuntimeError(f"Another process is writing the vector index at {self.path}")
+        with self._lock:
+            os.makedirs(self.path, exist_ok=True)
+            self._write_meta()
+
+    # --- SEARCHING ---
+    def _build_ann(self, partition):
+        try:
+            import hnswlib
+        except ImportError as e:
+            raise RuntimeError("VECTOR_INDEX_ANN=hnsw requires the hnswlib package") from e
+        ann = hnswlib.Index(space="ip", dim=self.dim)
+        ann.init_index(max_elements=len(partition), ef_construction=200, M=16)
+        ann.add_items(np.concatenate(partition.chunks), np.arange(len(partition)))
+        ann.set_ef(64)
+        return ann
+
+    def search(self, query_vector, leaning, k=2):
+        """Top k posts of one leaning most similar to query_vector"""
+        partition = self.partitions.get(leaning)
+        if not partition or k <= 0:
+            return []
+        query = normalize_rows(query_vector)[0]
+        self.searches += 1
+
+        if self.ann == "hnsw" and len(partition) >= self.ann_min_size:
+            with self._lock:
+                if partition.ann is None:
+                    partition.ann = self._build_ann(partition)
+            labels, distances = partition.ann.knn_query(query, k=min(k, len(partition)))
+            hits = [(1 - float(d), int(i)) for i, d in zip(labels[0], distances[0])]
+        else:
+            hits = partition.search(query, k)
+        return [dict(partition.docs[row], similarity=round(score, 4)) for score, row in hits]
+
+    def search_many(self, query_vector, quotas):
+        """{"neutral": 2, "right": 2} -> {"neutral": [...], "right": [...]}"""
+        return {leaning: self.search(query_vector, leaning, k) for leaning, k in quotas.items()}
+
+    def stats(self):
+        return {
+            "ready": self.ready,
+            "posts": {leaning: len(p) for leaning, p in self.partitions.items()},
+            "dim": self.dim,
+            "ann": self.ann or "none",
+            "searches": self.searches,
+            "offsets": dict(self.offsets),
+            "writer": self._writer_pid == os.getpid(),
+            "reloads": self.reloads,
+        }
+
+
+def vector_index_from_env(embed_fn=None, model_name=""):
+    """Build a VectorIndex configured from VECTOR_INDEX_* variables"""
+    return VectorIndex(
+        path=os.getenv("VECTOR_INDEX_PATH", "./vector_index"),
+        embed_fn=embed_fn,
+        model_name=model_name,
+        ann=os.getenv("VECTOR_INDEX_ANN", "none"),
+        ann_min_size=int(os.getenv("VECTOR_INDEX_ANN_MIN_SIZE", "20000")),
+    )
@@ -1,9 +1,11 @@
 import os
 import time
 import pandas as pd
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.exc import OperationalError
 
+from migrations import migrate
+
 
 # STEP 1: Read environment variables
 db_host = os.getenv("DB_HOST", "database")
@@ -62,27 +64,20 @@ else:
     print("No labelled CSVs found!")
 
 
-# STEP 4: Create user_activity table
-print("Creating 'user_activity' table (if not exists)...")
-
-create_user_activity_table_query = """
-CREATE TABLE IF NOT EXISTS user_activity (
-    id INT PRIMARY KEY AUTO_INCREMENT,
-    user_id VARCHAR(255),
-    title VARCHAR(255),
-    body TEXT,
-    bias_label VARCHAR(50),
-    subreddit VARCHAR(255),
-    threshold_reached BOOLEAN DEFAULT FALSE,
-    recommendation_triggered BOOLEAN DEFAULT FALSE,
-    recommended_post_urls TEXT,
-    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-);
-"""
-
-with engine.connect() as connection:
-    connection.execute(text(create_user_activity_table_query))
-    connection.commit()
+# Give the seeded tables a stable row id: the API's candidate indexes page
+# through them with WHERE id > last ORDER BY id (to_sql recreates the tables,
+# so this runs after every import rather than as a migration)
+for table in ("redditposts", "newsarticles"):
+    with engine.begin() as conn:
+        columns = {c["name"] for c in inspect(conn).get_columns(table)} if inspect(conn).has_table(table) else None
+        if columns is not None and "id" not in columns:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN id INT AUTO_INCREMENT PRIMARY KEY FIRST"))
+            print(f"Added id column to '{table}'")
+
+
+# STEP 4: Create/upgrade application tables (user_activity and its indexes)
+print("Applying schema migrations...")
+migrate(engine)
 
 print("'user_activity' table ready!")
-print("All CSV files imported and tables created successfully!")
+print("All CSV files imported and tables created successfully!")
\ No newline at end of file
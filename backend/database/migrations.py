@@ -0,0 +1,198 @@
+"""
+Versioned schema migrations for the application tables.
+
+Each migration has a version, a name and a list of steps. A step is either
+a SQL string or a function taking the connection. Applied versions are
+recorded in `schema_migrations`, and every step is written to be safe to
+re-run (IF NOT EXISTS, or a check before the change). A migration that
+failed halfway, e.g. because MySQL commits DDL implicitly, can therefore
+simply be run again.
+
+The seeder (create_tables.py) runs migrate(), and the API only checks
+the recorded version at startup. Run it by hand with:
+
+    python migrations.py            # apply pending migrations
+    python migrations.py --status   # list applied and pending versions
+"""
+import argparse
+import os
+
+from sqlalchemy import create_engine, inspect, text
+
+LOCK_NAME = "schema_migrations"
+
+
+def create_index(table, name, columns):
+    """Step that creates an index unless one with that name already exists"""
+    def step(conn):
+        existing = {ix["name"] for ix in inspect(conn).get_indexes(table)}
+        if name in existing:
+            print(f"  index {name} already exists")
+            return
+        conn.execute(text(f"CREATE INDEX {name} ON {table} ({', '.join(columns)})"))
+        print(f"  created index {name} on {table} ({', '.join(columns)})")
+    return step
+
+
+MIGRATIONS = [
+    (1, "create user_activity", [
+        """
+        CREATE TABLE IF NOT EXISTS user_activity (
+            id INT PRIMARY KEY AUTO_INCREMENT,
+            user_id VARCHAR(255),
+            title VARCHAR(255),
+            body TEXT,
+            bias_label VARCHAR(50),
+            subreddit VARCHAR(255),
+            threshold_reached BOOLEAN DEFAULT FALSE,
+            recommendation_triggered BOOLEAN DEFAULT FALSE,
+            recommended_post_urls TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+    (2, "index user_activity access paths", [
+        # /api/recommend: UPDATE ... WHERE user_id AND title ORDER BY timestamp DESC LIMIT 1
+        create_index("user_activity", "ix_user_activity_user_title_ts", ["user_id", "title", "timestamp"]),
+        # Dashboard: WHERE timestamp >= ... GROUP BY bias_label / subreddit (user_id
+        # makes the COUNT(DISTINCT user_id) breakdown index-only)
+        create_index("user_activity", "ix_user_activity_ts_bias", ["timestamp", "bias_label", "user_id"]),
+        create_index("user_activity", "ix_user_activity_ts_subreddit", ["timestamp", "subreddit"]),
+    ]),
+    (3, "daily user_activity rollups", [
+        # Maintained by backend/api/activity_rollup.py; read by the dashboard
+        """
+        CREATE TABLE IF NOT EXISTS activity_daily_bias (
+            day DATE NOT NULL,
+            bias_label VARCHAR(50) NOT NULL,
+            post_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, bias_label)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS activity_daily_subreddit (
+            day DATE NOT NULL,
+            subreddit VARCHAR(255) NOT NULL,
+            post_count INT NOT NULL DEFAULT 0,
+            titled_count INT NOT NULL DEFAULT 0,
+            title_length_sum BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, subreddit)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS activity_daily_user (
+            day DATE NOT NULL,
+            user_id VARCHAR(255) NOT NULL,
+            bias_label VARCHAR(50) NOT NULL,
+            post_count INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, bias_label, user_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS rollup_state (
+            name VARCHAR(64) PRIMARY KEY,
+            last_id INT NOT NULL DEFAULT 0,
+            seen_id INT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+        """,
+        "INSERT IGNORE INTO rollup_state (name, last_id, seen_id) VALUES ('user_activity_daily', 0, 0)",
+    ]),
+    (4, "create user_bias_counts", [
+        # Written by backend/api/bias_tracker.py (per-user left/right counts)
+        """
+        CREATE TABLE IF NOT EXISTS user_bias_counts (
+            user_id VARCHAR(255) PRIMARY KEY,
+            left_count INT NOT NULL DEFAULT 0,
+            right_count INT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+        )
+        """,
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        " version INT PRIMARY KEY, name VARCHAR(255) NOT NULL,"
+        " applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+    ))
+
+
+def applied_versions(conn):
+    _ensure_version_table(conn)
+    return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def migrate(engine, target=None):
+    """Apply pending migrations up to target (default: all); returns the versions applied"""
+    target = LATEST_VERSION if target is None else target
+    applied = []
+    with engine.connect() as conn:
+        # Seeder and a manual run must not apply the same migration twice
+        locking = engine.dialect.name == "mysql"
+        if locking and not conn.execute(text("SELECT GET_LOCK(:name, 60)"), {"name": LOCK_NAME}).scalar():
+            raise RuntimeError("Timed out waiting for the schema migration lock")
+        try:
+            done = applied_versions(conn)
+            conn.commit()
+            for version, name, steps in MIGRATIONS:
+                if version in done or version > target:
+                    continue
+                print(f"Applying migration {version}: {name}")
+                for step in steps:
+                    if callable(step):
+                        step(conn)
+                    else:
+                        conn.execute(text(step))
+                conn.execute(
+                    text("INSERT INTO schema_migrations (version, name) VALUES (:version, :name)"),
+                    {"version": version, "name": name},
+                )
+                conn.commit()
+                applied.append(version)
+        finally:
+            if locking:
+                conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": LOCK_NAME})
+    if not applied:
+        print(f"Schema is up to date (version {min(target, LATEST_VERSION)})")
+    return applied
+
+
+def engine_from_env():
+    """Engine for the DB_* variables used by the seeder (or DATABASE_URL)"""
+    url = os.getenv("DATABASE_URL")
+    if not url:
+        url = "mysql+pymysql://{}:{}@{}:{}/{}".format(
+            os.getenv("DB_USER", "root"),
+            os.getenv("DB_PASSWORD", "root"),
+            os.getenv("DB_HOST", "database"),
+            os.getenv("DB_PORT", "3306"),
+            os.getenv("DB_NAME", "mydatabase"),
+        )
+    return create_engine(url)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply versioned schema migrations")
+    parser.add_argument("--url", default=None, help="SQLAlchemy URL (default: DATABASE_URL or DB_* variables)")
+    parser.add_argument("--target", type=int, default=None, help="Stop after this version")
+    parser.add_argument("--status", action="store_true", help="Only list applied and pending migrations")
+    args = parser.parse_args()
+
+    engine = create_engine(args.url) if args.url else engine_from_env()
+    if args.status:
+        with engine.connect() as conn:
+            done = applied_versions(conn)
+            conn.commit()
+        for version, name, _ in MIGRATIONS:
+            print(f"{version:>4}  {'applied' if version in done else 'pending':<8} {name}")
+        return
+    migrate(engine, args.target)
+
+
+if __name__ == "__main__":
+    main()
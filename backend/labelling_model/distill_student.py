@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""distill_student.py
+
+# Distilling the RoBERTa bias classifier into a smaller student
+
+The fine-tuned roberta-base model from bias_model.py is the teacher. A
+smaller encoder (distilroberta-base by default) is trained to match the
+teacher's temperature-softened probabilities on the labelled and unlabelled
+CSVs, mixed with the hard labels where a row has one.
+
+The student is saved as a model bundle (see backend/api/model_bundle.py), so
+it is a drop-in replacement for the API model:
+
+    python distill_student.py --teacher ../api/bias_model_bundle \
+        --labelled labelled_data_clean.csv --unlabelled ../database/data/unlabelled_data_clean.csv \
+        --out ../api/student_model_bundle
+
+Then compare it to the teacher with student_report.py before deploying.
+"""
+
+import argparse
+import os
+import random
+import sys
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import torch
+import torch.nn.functional as F
+from transformers import AutoModelForSequenceClassification, get_linear_schedule_with_warmup
+
+# reuse the API's bundle format and loaders
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+from model_bundle import load_model, load_tokenizer, save_bundle
+
+"""## Step 1: Load data"""
+
+def load_texts(path):
+    """Return (texts, bias_text labels or None) from one of the project CSVs"""
+    df = pd.read_csv(path)
+    texts = (df["title"].fillna("").astype(str) + " " + df["body"].fillna("").astype(str)).str.strip()
+    labels = df["bias_text"].astype(str).str.lower() if "bias_text" in df.columns else None
+    keep = texts != ""
+    return texts[keep].tolist(), (labels[keep].tolist() if labels is not None else [None] * keep.sum())
+
+def hard_label_ids(labels, label_map):
+    """Map bias_text values onto the teacher's label indices (-1 when unknown)"""
+    name_to_id = {name: idx for idx, name in label_map.items()}
+    # the labelled data calls the neutral class 'center'
+    name_to_id.setdefault("center", name_to_id.get("neutral", -1))
+    return [name_to_id.get(label, -1) if label else -1 for label in labels]
+
+"""## Step 2: Teacher soft labels"""
+
+@torch.no_grad()
+def teacher_logits(model, tokenizer, texts, max_length, batch_size):
+    model.eval()
+    outputs = []
+    for i in range(0, len(texts), batch_size):
+        inputs = tokenizer(texts[i:i + batch_size], return_tensors="pt", truncation=True, padding=True, max_length=max_length)
+        outputs.append(model(**inputs).logits.float())
+        if (i // batch_size) % 20 == 0:
+            print(f"  teacher: {i + len(outputs[-1])}/{len(texts)}")
+    return torch.cat(outputs)
+
+"""## Step 3: Distillation loss"""
+
+def distillation_loss(student_logits, teacher_logits, hard_labels, temperature, alpha):
+    """
+    (1 - alpha) * T^2 * KL(teacher_T || student_T) + alpha * CE(hard labels)
+
+    Rows without a hard label (-1) only contribute the soft term.
+    """
+    soft = F.kl_div(
+        F.log_softmax(student_logits / temperature, dim=1),
+        F.softmax(teacher_logits / temperature, dim=1),
+        reduction="batchmean",
+    ) * temperature ** 2
+
+    has_label = hard_labels >= 0
+    if alpha == 0 or not has_label.any():
+        return soft
+    hard = F.cross_entropy(student_logits[has_label], hard_labels[has_label])
+    return (1 - alpha) * soft + alpha * hard
+
+"""## Step 4: Train the student"""
+
+def train_student(args, texts, soft_targets, hard_labels, tokenizer, num_labels):
+    student = AutoModelForSequenceClassification.from_pretrained(args.student, num_labels=num_labels)
+    optimizer = torch.optim.AdamW(student.parameters(), lr=args.lr, weight_decay=0.01)
+    steps_per_epoch = (len(texts) + args.batch_size - 1) // args.batch_size
+    scheduler = get_linear_schedule_with_warmup(optimizer, int(0.1 * steps_per_epoch * args.epochs), steps_per_epoch * args.epochs)
+
+    order = list(range(len(texts)))
+    for epoch in range(args.epochs):
+        student.train()
+        random.shuffle(order)
+        total = 0.0
+        for step in range(steps_per_epoch):
+            idx = order[step * args.batch_size:(step + 1) * args.batch_size]
+            inputs = tokenizer([texts[i] for i in idx], return_tensors="pt", truncation=True, padding=True, max_length=args.max_length)
+            logits = student(**inputs).logits
+            loss = distillation_loss(logits, soft_targets[idx], hard_labels[idx], args.temperature, args.alpha)
+
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(student.parameters(), 1.0)
+            optimizer.step()
+            scheduler.step()
+            optimizer.zero_grad()
+            total += loss.item()
+
+        print(f"Epoch {epoch + 1}/{args.epochs} - distillation loss: {total / steps_per_epoch:.4f}")
+    student.eval()
+    return student
+
+@torch.no_grad()
+def agreement(student, tokenizer, texts, teacher_preds, max_length, batch_size):
+    preds = []
+    for i in range(0, len(texts), batch_size):
+        inputs = tokenizer(texts[i:i + batch_size], return_tensors="pt", truncation=True, padding=True, max_length=max_length)
+        preds.append(student(**inputs).logits.argmax(dim=1))
+    return (torch.cat(preds) == teacher_preds).float().mean().item()
+
+"""## Step 5: Run"""
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill the RoBERTa bias classifier into a smaller student")
+    parser.add_argument("--teacher", default="../api/bias_model_bundle", help="Teacher bundle directory or .pkl")
+    parser.add_argument("--labelled", nargs="*", default=["labelled_data_clean.csv"])
+    parser.add_argument("--unlabelled", nargs="*", default=["../database/data/unlabelled_data_clean.csv"])
+    parser.add_argument("--student", default="distilroberta-base", help="HuggingFace name of the student encoder")
+    parser.add_argument("--out", default="../api/student_model_bundle")
+    parser.add_argument("--version", default=None)
+    parser.add_argument("--epochs", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--lr", type=float, default=5e-5)
+    parser.add_argument("--temperature", type=float, default=2.0)
+    parser.add_argument("--alpha", type=float, default=0.3, help="Weight of the hard-label loss on labelled rows")
+    parser.add_argument("--max-length", type=int, default=256)
+    parser.add_argument("--holdout", type=float, default=0.1, help="Fraction kept out for the agreement check")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    np.random.seed(args.seed)
+    torch.manual_seed(args.seed)
+
+    # load data
+    texts, labels = [], []
+    for path in args.labelled + args.unlabelled:
+        if os.path.exists(path):
+            t, l = load_texts(path)
+            print(f"Loaded {len(t)} rows from {path}")
+            texts += t
+            labels += l
+        else:
+            print(f"Skipping missing file {path}")
+
+    teacher, teacher_tokenizer, manifest = load_model(args.teacher)
+    label_map = manifest["label_map"]
+    tokenizer = load_tokenizer(args.student)
+
+    # hold out a slice for the agreement check
+    order = np.random.permutation(len(texts))
+    n_holdout = int(len(texts) * args.holdout)
+    holdout_idx, train_idx = order[:n_holdout], order[n_holdout:]
+    train_texts = [texts[i] for i in train_idx]
+    holdout_texts = [texts[i] for i in holdout_idx]
+
+    print("\nComputing teacher soft labels...")
+    soft_targets = teacher_logits(teacher, teacher_tokenizer, train_texts, args.max_length, args.batch_size * 2)
+    holdout_teacher = teacher_logits(teacher, teacher_tokenizer, holdout_texts, args.max_length, args.batch_size * 2).argmax(dim=1)
+    hard_labels = torch.tensor(hard_label_ids([labels[i] for i in train_idx], label_map))
+    print(f"{(hard_labels >= 0).sum().item()} of {len(train_texts)} training rows have hard labels")
+
+    print(f"\nTraining {args.student} student...")
+    student = train_student(args, train_texts, soft_targets, hard_labels, tokenizer, num_labels=len(label_map))
+
+    if holdout_texts:
+        score = agreement(student, tokenizer, holdout_texts, holdout_teacher, args.max_length, args.batch_size * 2)
+        print(f"\nHold-out label agreement with teacher: {score * 100:.2f}%")
+
+    version = args.version or f"distilled-{args.student.split('/')[-1]}-{datetime.now():%Y%m%d}"
+    save_bundle(student, tokenizer, args.out, version=version, max_length=args.max_length, label_map=label_map)
+    print(f"\n✓ Student bundle '{version}' saved to {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""student_report.py
+
+# Teacher vs student report
+
+Compares the distilled student with the RoBERTa teacher on CPU and writes a
+markdown report with:
+
+- single-post latency (p50/p95, batch size 1, the per-scroll case)
+- throughput at a larger batch size
+- label agreement with the teacher, overall and per teacher label
+- accuracy against gold labels for any labelled CSV passed in
+
+    python student_report.py --teacher ../api/bias_model_bundle --student ../api/student_model_bundle \
+        --data ../database/data/unlabelled_data_clean.csv --gold labelled_data_clean.csv
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+import torch
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "api"))
+from model_bundle import load_model
+from distill_student import hard_label_ids, load_texts
+
+@torch.no_grad()
+def predict(model, tokenizer, texts, max_length, batch_size):
+    preds = []
+    for i in range(0, len(texts), batch_size):
+        inputs = tokenizer(texts[i:i + batch_size], return_tensors="pt", truncation=True, padding=True, max_length=max_length)
+        preds.append(model(**inputs).logits.argmax(dim=1))
+    return torch.cat(preds).numpy()
+
+@torch.no_grad()
+def measure_speed(model, tokenizer, texts, max_length, batch_size, n_single):
+    """Return (p50 ms, p95 ms) for single posts and posts/s at batch_size"""
+    latencies = []
+    for text in texts[:n_single]:
+        start = time.perf_counter()
+        inputs = tokenizer([text], return_tensors="pt", truncation=True, max_length=max_length)
+        model(**inputs)
+        latencies.append((time.perf_counter() - start) * 1000)
+    latencies.sort()
+
+    start = time.perf_counter()
+    predict(model, tokenizer, texts, max_length, batch_size)
+    throughput = len(texts) / (time.perf_counter() - start)
+    return statistics.median(latencies), latencies[int(len(latencies) * 0.95) - 1], throughput
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency, throughput and agreement of the student vs the teacher")
+    parser.add_argument("--teacher", default="../api/bias_model_bundle")
+    parser.add_argument("--student", default="../api/student_model_bundle")
+    parser.add_argument("--data", default="../database/data/unlabelled_data_clean.csv")
+    parser.add_argument("--gold", nargs="*", default=[], help="Labelled CSVs (bias_text column) for accuracy")
+    parser.add_argument("--limit", type=int, default=1000)
+    parser.add_argument("--single", type=int, default=200, help="Posts used for the batch size 1 latency")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-length", type=int, default=256)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--out", default="distillation_report.md")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    texts, _ = load_texts(args.data)
+    texts = texts[:args.limit]
+
+    teacher, teacher_tokenizer, teacher_manifest = load_model(args.teacher)
+    student, student_tokenizer, student_manifest = load_model(args.student)
+    label_map = teacher_manifest["label_map"]
+
+    rows = []
+    for name, model, tokenizer in [("teacher", teacher, teacher_tokenizer), ("student", student, student_tokenizer)]:
+        p50, p95, throughput = measure_speed(model, tokenizer, texts, args.max_length, args.batch_size, args.single)
+        params = sum(p.numel() for p in model.parameters()) / 1e6
+        rows.append((name, params, p50, p95, throughput))
+        print(f"{name}: {params:.0f}M params, p50 {p50:.1f} ms, p95 {p95:.1f} ms, {throughput:.1f} posts/s")
+
+    teacher_preds = predict(teacher, teacher_tokenizer, texts, args.max_length, args.batch_size)
+    student_preds = predict(student, student_tokenizer, texts, args.max_length, args.batch_size)
+    overall = (teacher_preds == student_preds).mean()
+
+    lines = [
+        "# Distillation report",
+        "",
+        f"Teacher: `{teacher_manifest['version']}`  ",
+        f"Student: `{student_manifest['version']}`  ",
+        f"Posts: {len(texts)} from `{os.path.basename(args.data)}`, max_length {args.max_length}, "
+        f"torch threads {torch.get_num_threads()}",
+        "",
+        "## Speed (CPU)",
+        "",
+        "| Model | Params (M) | p50 latency, batch 1 (ms) | p95 latency, batch 1 (ms) | Throughput, batch "
+        f"{args.batch_size} (posts/s) |",
+        "|---|---|---|---|---|",
+    ]
+    for name, params, p50, p95, throughput in rows:
+        lines.append(f"| {name} | {params:.0f} | {p50:.1f} | {p95:.1f} | {throughput:.1f} |")
+    lines += [
+        "",
+        f"Speed-up: {rows[0][2] / rows[1][2]:.2f}x latency, {rows[1][4] / rows[0][4]:.2f}x throughput",
+        "",
+        "## Agreement with teacher",
+        "",
+        f"Overall label agreement: **{overall * 100:.2f}%**",
+        "",
+        "| Teacher label | Posts | Student agrees |",
+        "|---|---|---|",
+    ]
+    for idx, label in sorted(label_map.items()):
+        mask = teacher_preds == idx
+        if mask.any():
+            lines.append(f"| {label} | {mask.sum()} | {(student_preds[mask] == idx).mean() * 100:.2f}% |")
+
+    for path in args.gold:
+        gold_texts, gold_labels = load_texts(path)
+        gold = np.array(hard_label_ids(gold_labels, label_map))
+        keep = gold >= 0
+        gold_texts = [t for t, k in zip(gold_texts, keep) if k]
+        gold = gold[keep]
+        if not len(gold):
+            continue
+        lines += ["", f"## Accuracy on `{os.path.basename(path)}` ({len(gold)} labelled posts)", ""]
+        for name, model, tokenizer in [("teacher", teacher, teacher_tokenizer), ("student", student, student_tokenizer)]:
+            preds = predict(model, tokenizer, gold_texts, args.max_length, args.batch_size)
+            lines.append(f"- {name}: {(preds == gold).mean() * 100:.2f}%")
+
+    with open(args.out, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    print(f"\n✓ Report written to {args.out}")
+
+if __name__ == "__main__":
+    main()
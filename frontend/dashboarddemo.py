@@ -54,18 +54,37 @@ def get_political_spectrum_data():
         return None
     
     try:
+        # Whole days come from the daily rollups maintained by the API
+        # (backend/api/activity_rollup.py); the window's first, partial day and
+        # rows not rolled up yet come from user_activity. The window is still
+        # the last N*24 hours, and NULL labels/users count as they did in the
+        # raw query (rollups store them as '').
         query = """
         SELECT 
-            bias_label,
-            COUNT(*) as post_count,
-            COUNT(DISTINCT user_id) as unique_users
-        FROM user_activity 
-        WHERE timestamp >= DATE_SUB(NOW(), INTERVAL %s DAY)
+            NULLIF(bias_label, '') as bias_label,
+            CAST(SUM(post_count) AS SIGNED) as post_count,
+            COUNT(DISTINCT NULLIF(user_id, '')) as unique_users
+        FROM (
+            SELECT bias_label, user_id, post_count
+            FROM activity_daily_user
+            WHERE day > DATE(DATE_SUB(NOW(), INTERVAL %(days)s DAY))
+            UNION ALL
+            SELECT COALESCE(bias_label, ''), COALESCE(user_id, ''), 1
+            FROM user_activity
+            WHERE id <= (SELECT last_id FROM rollup_state WHERE name = 'user_activity_daily')
+              AND timestamp >= DATE_SUB(NOW(), INTERVAL %(days)s DAY)
+              AND timestamp < DATE(DATE_SUB(NOW(), INTERVAL %(days)s DAY)) + INTERVAL 1 DAY
+            UNION ALL
+            SELECT COALESCE(bias_label, ''), COALESCE(user_id, ''), 1
+            FROM user_activity
+            WHERE id > (SELECT last_id FROM rollup_state WHERE name = 'user_activity_daily')
+              AND timestamp >= DATE_SUB(NOW(), INTERVAL %(days)s DAY)
+        ) activity
         GROUP BY bias_label
         ORDER BY post_count DESC
         """
         
-        df = pd.read_sql(query, engine, params=(days_back,))
+        df = pd.read_sql(query, engine, params={"days": days_back})
         return df
     except Exception as e:
         st.error(f"Error fetching political data: {e}")
@@ -79,13 +98,28 @@ def get_top_categories_data():
         return None
     
     try:
+        # Same split between rollups and user_activity as the political data
         query = """
         SELECT 
-            subreddit,
-            COUNT(*) as post_count,
-            AVG(LENGTH(title)) as avg_title_length
-        FROM user_activity 
-        WHERE timestamp >= DATE_SUB(NOW(), INTERVAL 30 DAY)
+            NULLIF(subreddit, '') as subreddit,
+            CAST(SUM(post_count) AS SIGNED) as post_count,
+            CAST(SUM(title_length_sum) / NULLIF(SUM(titled_count), 0) AS DOUBLE) as avg_title_length
+        FROM (
+            SELECT subreddit, post_count, titled_count, title_length_sum
+            FROM activity_daily_subreddit
+            WHERE day > DATE(DATE_SUB(NOW(), INTERVAL 30 DAY))
+            UNION ALL
+            SELECT COALESCE(subreddit, ''), 1, title IS NOT NULL, COALESCE(LENGTH(title), 0)
+            FROM user_activity
+            WHERE id <= (SELECT last_id FROM rollup_state WHERE name = 'user_activity_daily')
+              AND timestamp >= DATE_SUB(NOW(), INTERVAL 30 DAY)
+              AND timestamp < DATE(DATE_SUB(NOW(), INTERVAL 30 DAY)) + INTERVAL 1 DAY
+            UNION ALL
+            SELECT COALESCE(subreddit, ''), 1, title IS NOT NULL, COALESCE(LENGTH(title), 0)
+            FROM user_activity
+            WHERE id > (SELECT last_id FROM rollup_state WHERE name = 'user_activity_daily')
+              AND timestamp >= DATE_SUB(NOW(), INTERVAL 30 DAY)
+        ) activity
         GROUP BY subreddit
         ORDER BY post_count DESC
         LIMIT 5
@@ -297,7 +331,7 @@ with col1:
     # Political Spectrum Card
     st.markdown('<div class="card-header">Political Spectrum Distribution</div>', unsafe_allow_html=True)
     
-    # Get live data from user_activity table
+    # Get live data from the user_activity rollups
     political_data = get_political_spectrum_data()
     
     if political_data is not None and not political_data.empty: